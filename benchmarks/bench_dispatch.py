@@ -0,0 +1,113 @@
+"""Microbenchmark: per-node cost of EnhancedMarkdownConverter._convert_node.
+
+Compares the handler-registry dispatch with the if/elif dispatch it replaced,
+kept here as `IfElifConverter`: the current converter with only _start_task
+swapped for the old way of picking a tag's conversion, a chain of tag-name
+comparisons plus a throwaway BeautifulSoup built for every node to
+type-check lists of children. Both sides run the same handlers, so their
+output is checked to be identical and the difference is the dispatch alone.
+
+The inputs are every HTML fixture in test_cases/ (string literals assigned to
+a variable named `html`, plus the parser conformance corpus). Each fixture is
+parsed and preprocessed once, outside the timed region, so only the tree walk
+and tag dispatch are measured.
+
+    python benchmarks/bench_dispatch.py [--repeat N]
+"""
+import argparse
+import ast
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from bs4 import BeautifulSoup, NavigableString, Tag
+from markdown_enhancer import EnhancedMarkdownConverter
+
+
+def load_fixtures():
+    fixtures = []
+    test_dir = os.path.join(ROOT, 'test_cases')
+    for name in sorted(os.listdir(test_dir)):
+        if not name.endswith('.py'):
+            continue
+        with open(os.path.join(test_dir, name), encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Assign) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str):
+                if any(isinstance(t, ast.Name) and t.id == 'html' for t in node.targets):
+                    fixtures.append(node.value.value)
+            elif isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == 'CONFORMANCE_CORPUS' for t in node.targets):
+                fixtures.extend(ast.literal_eval(node.value))
+    return fixtures
+
+
+class IfElifConverter(EnhancedMarkdownConverter):
+    def _start_task(self, element, context):
+        if isinstance(element, NavigableString):
+            return self._convert_text(element, context, line_start=True)
+        if isinstance(element, list) or isinstance(element, type(BeautifulSoup().contents)):
+            return self._convert_sequence(element, context)
+        if not isinstance(element, Tag):
+            return ''
+        name = element.name
+        if name == 'p': entry = (self._convert_p, True, False)
+        elif name in ['strong', 'b']: entry = (self._convert_strong, True, False)
+        elif name in ['em', 'i']: entry = (self._convert_em, True, False)
+        elif name.startswith('h') and len(name) == 2 and name[1].isdigit(): entry = (self._convert_heading, True, False)
+        elif name == 'blockquote': entry = (self._convert_blockquote, False, False)
+        elif name == 'li': entry = (self._convert_passthrough, True, True)
+        elif name == 'ul': entry = (self._convert_ul, False, False)
+        elif name == 'ol': entry = (self._convert_ol, False, False)
+        elif name == 'a': entry = (self._convert_a, True, False)
+        elif name in ['table', 'thead', 'tbody', 'tfoot', 'tr']: entry = (self._convert_table, False, False)
+        elif name in ['th', 'td']: entry = (self._convert_passthrough, True, True)
+        elif name == 'pre': entry = (self._convert_pre, False, False)
+        elif name == 'code': entry = (self._convert_code, True, False)
+        elif name == 'br': entry = (self._convert_br, True, False)
+        elif name == 'img': entry = (self._convert_img, True, False)
+        elif name in ['html', 'body', 'title']: entry = (self._convert_passthrough, True, False)
+        else: entry = self._default_handler
+        handler, convert_children, nest_children = entry
+        if convert_children:
+            child_context = self._enter(element, context) if nest_children or name in self._context_tags else context
+            return self._convert_children_then(element, handler, context, child_context)
+        return handler(element, None, context)
+
+
+def count_nodes(soup):
+    return 1 + sum(count_nodes(child) if isinstance(child, Tag) else 1 for child in soup.contents)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    converter = EnhancedMarkdownConverter()
+    legacy = IfElifConverter()
+    soups = [converter._preprocess_html(html) for html in load_fixtures()]
+    nodes = sum(count_nodes(soup) for soup in soups)
+    for soup in soups:
+        assert legacy._convert_node(soup) == converter._convert_node(soup)
+
+    def best_of(convert_node):
+        best = float('inf')
+        for _ in range(5):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for soup in soups:
+                    convert_node(soup)
+            best = min(best, time.perf_counter() - start)
+        return best / (args.repeat * nodes) * 1e6
+
+    chain = best_of(legacy._convert_node)
+    registry = best_of(converter._convert_node)
+    print(f'{len(soups)} fixtures, {nodes} nodes')
+    print(f'  if/elif chain     {chain:6.2f} µs/node')
+    print(f'  handler registry  {registry:6.2f} µs/node   ({chain / registry:.1f}x)')
+
+if __name__ == '__main__':
+    main()
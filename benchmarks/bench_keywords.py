@@ -0,0 +1,84 @@
+"""Benchmark: speaker classification of text blocks in the heuristic extractors.
+
+Compares the precomputed KeywordMatcher scan (one lowercased view per block,
+all keyword groups in one compiled pattern) with the previous checks, kept
+here as `legacy_classify_text` and `legacy_classify_prefix`: an `any()` over
+each keyword list that lowercases the block again for every keyword.
+
+    python benchmarks/bench_keywords.py [--blocks N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from main import BOT_KEYWORDS, SPEAKER_PREFIX_MATCHER, TEXT_KEYWORD_MATCHER, USER_KEYWORDS
+
+WORDS = ('el la de que en un por con para como pero más hacer poder decir este otro puede ayudar '
+         'código función lista python error archivo respuesta modelo usuario gemini').split()
+MARKERS = ['tú:', 'Gemini:', 'pregunta:', 'como IA', 'puedo ayudarte', 'you:', 'model:']
+
+
+def legacy_classify_text(block):
+    if any(keyword in block.lower() for keyword in USER_KEYWORDS):
+        return 'Tú'
+    elif any(keyword in block.lower() for keyword in BOT_KEYWORDS):
+        return 'Gemini'
+    return None
+
+
+def legacy_classify_prefix(content):
+    if 'tú:' in content.lower() or 'you:' in content.lower():
+        return 'Tú'
+    elif 'gemini:' in content.lower() or 'model:' in content.lower():
+        return 'Gemini'
+    return None
+
+
+def make_blocks(count, seed=1):
+    # Mostly unmarked prose, as in real pages, with a marker in about one block in five
+    rng = random.Random(seed)
+    blocks = []
+    for _ in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(5, 120))]
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(MARKERS))
+        blocks.append(' '.join(words).capitalize())
+    return blocks
+
+
+def best_of(runs, fn):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--blocks', type=int, default=20000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    blocks = make_blocks(args.blocks)
+    size = sum(len(block) for block in blocks)
+    print(f'{len(blocks)} blocks, {size / 1e6:.2f} MB of text')
+    cases = [
+        ('text keywords (21)', legacy_classify_text, TEXT_KEYWORD_MATCHER.classify),
+        ('speaker prefixes (4)', legacy_classify_prefix, SPEAKER_PREFIX_MATCHER.classify),
+    ]
+    for name, legacy, matcher in cases:
+        assert [legacy(b) for b in blocks] == [matcher(b) for b in blocks], f'{name}: matcher diverged'
+        before = best_of(args.runs, lambda: [legacy(b) for b in blocks])
+        after = best_of(args.runs, lambda: [matcher(b) for b in blocks])
+        print(f'{name:22} legacy {len(blocks) / before:10,.0f} blocks/s   '
+              f'matcher {len(blocks) / after:10,.0f} blocks/s  ({before / after:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
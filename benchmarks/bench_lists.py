@@ -0,0 +1,111 @@
+"""Benchmark: conversion of long nested <ul>/<ol> lists.
+
+Compares the list renderer of EnhancedMarkdownConverter (one pass over each
+item's children, item bodies indented as a whole) with the previous one, kept
+here as `legacy_list_items`: per item it ran find(['ul', 'ol']) and find(True),
+walked the previous_sibling chain and re-split the rendered item on newlines.
+The legacy renderer also indented nested lists twice, so only the timings are
+compared, not the output.
+
+    python benchmarks/bench_lists.py [--items N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bs4 import NavigableString, Tag
+from markdown_enhancer import EnhancedMarkdownConverter
+
+
+def legacy_list_items(converter, element, context, ordered):
+    current_element_indent_prefix = converter.indent_char * context.nesting_level
+    md_items = []
+    for i, li_element in enumerate(element.find_all('li', recursive=False)):
+        li_content_markdown = (yield li_element, context).strip()
+        marker = f"{i + 1}. " if ordered else '* '
+        has_sublist = li_element.find(['ul', 'ol'], recursive=False)
+        if not li_content_markdown and not has_sublist:
+            is_truly_empty_text_nodes = not any(c.strip() for c in li_element.contents if isinstance(c, NavigableString))
+            is_truly_empty_tags = not li_element.find(True, recursive=False)
+            if is_truly_empty_text_nodes and is_truly_empty_tags:
+                md_items.append(current_element_indent_prefix + marker)
+                continue
+        first_line_content, has_more_lines, more_lines = li_content_markdown.partition('\n')
+        first_child_tag = li_element.find(True, recursive=False)
+        bullet_on_own_line = False
+        if first_child_tag and first_child_tag.name in ['ul', 'ol', 'pre', 'blockquote']:
+            no_text_before = True; prev_sibling = first_child_tag.previous_sibling
+            while prev_sibling:
+                if (isinstance(prev_sibling, NavigableString) and prev_sibling.strip()) or isinstance(prev_sibling, Tag):
+                    no_text_before = False; break
+                prev_sibling = prev_sibling.previous_sibling
+            if no_text_before: bullet_on_own_line = True
+        if bullet_on_own_line:
+            md_items.append(current_element_indent_prefix + marker.strip())
+            md_items.append(first_line_content)
+        else:
+            md_items.append(current_element_indent_prefix + marker + first_line_content)
+        if has_more_lines:
+            subsequent_line_text_indent = current_element_indent_prefix + (' ' * len(marker) if ordered else converter.indent_char)
+            md_items.append(converter._indent_block(more_lines, subsequent_line_text_indent))
+    return "\n".join(md_items) + "\n\n" if md_items else "\n\n"
+
+
+def legacy_converter():
+    converter = EnhancedMarkdownConverter()
+    for name, ordered in (('ul', False), ('ol', True)):
+        converter.register_handler(name, lambda element, content, context, ordered=ordered:
+                                   legacy_list_items(converter, element, context, ordered), convert_children=False)
+    return converter
+
+
+def nested_list(items):
+    # A Gemini-style outline of about `items` items: every tenth top-level item
+    # opens a numbered sublist of five, whose first item opens a bulleted one of three
+    sizes = [None, 5, 3]
+
+    def build(count, level):
+        tag = 'ol' if level % 2 else 'ul'
+        parts = []
+        for n in range(count):
+            item = f'Punto <b>{level}.{n}</b> con <code>valor_{n}</code> y <a href="https://e.com/{n}">enlace</a>'
+            if level + 1 < len(sizes) and n % (10 if level == 0 else 5) == 0:
+                item += build(sizes[level + 1], level + 1)
+            parts.append(f'<li>{item}</li>')
+        return f'<{tag}>' + ''.join(parts) + f'</{tag}>'
+    # 10 + 5 + 3 items per ten top-level ones
+    return build(round(items / 1.8), 0)
+
+
+def best_of(runs, fn):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    html = nested_list(args.items)
+    current = EnhancedMarkdownConverter()
+    soup = current._preprocess_html(html)
+    items = len(soup.find_all('li'))
+    legacy = legacy_converter()
+    before = best_of(args.runs, lambda: legacy._convert_node(soup))
+    after = best_of(args.runs, lambda: current._convert_node(soup))
+    print(f'{items} list items, {len(html) / 1e3:.0f} kB of HTML; preprocessing excluded')
+    print(f'legacy renderer:  {before * 1000:8.1f} ms  {before / items * 1e6:6.1f} µs/item')
+    print(f'unified renderer: {after * 1000:8.1f} ms  {after / items * 1e6:6.1f} µs/item  ({before / after:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Benchmark: preprocessing of deeply nested Gemini div/span soup.
+
+Compares the single-walk copy used by EnhancedMarkdownConverter (removal,
+unwrapping and attribute filtering in one iterative pass, source untouched)
+with the previous approach, kept here as `legacy_preprocess`: one find_all per
+removable tag, up to five find_all passes per unwrappable tag and a final
+find_all(True) for attributes, all mutating the tree. Parsing is excluded from
+the timings.
+
+    python benchmarks/bench_preprocess.py [--turns N] [--depth N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from bs4 import BeautifulSoup
+from markdown_enhancer import EnhancedMarkdownConverter
+
+
+def legacy_preprocess(converter, soup):
+    for tag_name in converter.tags_to_remove:
+        for tag in soup.find_all(tag_name):
+            tag.decompose()
+    for _ in range(5):
+        unwrapped_in_pass = 0
+        for tag_name in converter.tags_to_unwrap:
+            for tag in soup.find_all(tag_name):
+                tag.unwrap()
+                unwrapped_in_pass += 1
+        if unwrapped_in_pass == 0:
+            break
+    for tag in soup.find_all(True):
+        allowed_tag_attrs = converter.allowed_attrs.get(tag.name, [])
+        for attr_name in list(tag.attrs.keys()):
+            if attr_name not in allowed_tag_attrs:
+                del tag[attr_name]
+    return soup
+
+
+def gemini_soup(turns, depth):
+    # Angular wraps every block in several layers of attribute-heavy div/span
+    wrap_open = ''.join(f'<div class="c{d}" _ngcontent-ng-c{d}=""><span class="s{d}" jslog="{d}">' for d in range(depth))
+    wrap_close = '</span></div>' * depth
+    turn = (f'<div id="model-response-message-contentr_{{n}}" class="markdown" _ngcontent-ng-c1="">{wrap_open}'
+            '<p>Respuesta <b>{n}</b> con <code class="x">código</code> y <a href="https://e.com" target="_blank">enlace</a>.</p>'
+            f'<ul><li>{wrap_open}Uno{wrap_close}</li><li>Dos</li></ul><script>track({{n}})</script>{wrap_close}</div>')
+    return '<html><body>' + ''.join(turn.format(n=n) for n in range(turns)) + '</body></html>'
+
+
+def best_of(runs, fn):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--turns', type=int, default=200)
+    parser.add_argument('--depth', type=int, default=8)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    converter = EnhancedMarkdownConverter()
+    html = gemini_soup(args.turns, args.depth)
+    reference = BeautifulSoup(html, 'html.parser')
+    # The legacy passes mutate their input, so each run gets a freshly parsed soup
+    fresh = [BeautifulSoup(html, 'html.parser') for _ in range(args.runs)]
+    legacy = best_of(args.runs, lambda: legacy_preprocess(converter, fresh.pop()))
+    single = best_of(args.runs, lambda: converter._copy_children(reference, BeautifulSoup('', 'html.parser'), False, False))
+
+    expected = str(legacy_preprocess(converter, BeautifulSoup(html, 'html.parser')))
+    cleaned = BeautifulSoup('', 'html.parser')
+    converter._copy_children(reference, cleaned, False, False)
+    assert str(cleaned) == expected, 'single-pass preprocessing diverged from the legacy passes'
+
+    nodes = len(reference.find_all(True))
+    print(f'{args.turns} turns, wrapper depth {args.depth}, {nodes} tags, {len(html) / 1e6:.2f} MB')
+    print(f'legacy find_all passes: {legacy * 1000:8.1f} ms')
+    print(f'single walk (copy):     {single * 1000:8.1f} ms  ({legacy / single:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark: conversion of long comparison tables.
+
+Compares the table engine of EnhancedMarkdownConverter (rows walked once,
+header and separator built from the widest row) with the previous handlers,
+kept here as `legacy_*`: <table> looked its sections up with find(), <thead>
+re-queried the sibling <tbody> to count columns, and every <tr> collected its
+cells with find_all(). The legacy handlers padded empty cells with a space, so
+only the timings are compared, not the output.
+
+    python benchmarks/bench_tables.py [--rows N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from markdown_enhancer import EnhancedMarkdownConverter
+
+
+def legacy_table(element, content, context):
+    header_md = ""; tbody_md = ""
+    thead = element.find('thead')
+    if thead: header_md = yield thead, context
+    tbody = element.find('tbody')
+    if tbody: tbody_md = yield tbody, context
+    if not header_md.strip() and not tbody_md.strip(): return "\n\n"
+    return (header_md + tbody_md).strip('\n') + "\n\n"
+
+
+def legacy_thead(element, content, context):
+    tr_elements = element.find_all('tr', recursive=False)
+    rows = []
+    for tr in tr_elements: rows.append((yield tr, context))
+    if not any(row.strip() for row in rows): return ""
+    num_cols = 0
+    if tr_elements: num_cols = len(tr_elements[0].find_all(['th', 'td'], recursive=False))
+    if num_cols == 0 and element.parent and element.parent.name == 'table':
+        tbody = element.parent.find('tbody')
+        if tbody and tbody.find('tr'): num_cols = len(tbody.find('tr').find_all('td', recursive=False))
+    separator = "| " + " | ".join(["---"] * num_cols) + " |\n" if num_cols > 0 else "|\n"
+    return "".join(rows) + separator
+
+
+def legacy_tbody(element, content, context):
+    rows = []
+    for tr in element.find_all('tr', recursive=False): rows.append((yield tr, context))
+    return "".join(rows)
+
+
+def legacy_tr(element, content, context):
+    cells = []
+    for cell_el in element.find_all(['th', 'td'], recursive=False):
+        cell_content = yield cell_el, context
+        is_code = cell_content.strip().startswith('```') and cell_content.strip().endswith('```')
+        if is_code:
+            lines = cell_content.strip().split('\n')
+            if len(lines) >= 2:
+                code_lines = lines[1:-1]
+                escaped_code = [l.replace('|', '\\|') for l in code_lines]
+                text = lines[0] + '\n' + '\n'.join(escaped_code) + '\n' + lines[-1]
+                text = text.replace('\n', '<br>')
+            else: text = cell_content.strip().replace('|', '\\|').replace('\n', '<br>')
+        else: text = cell_content.strip().replace('|', '\\|').replace('\n', '<br>')
+        cells.append(text if text.strip() else " ")
+    return "| " + " | ".join(cells) + " |\n" if cells else ""
+
+
+def legacy_converter():
+    converter = EnhancedMarkdownConverter()
+    for name, handler in (('table', legacy_table), ('thead', legacy_thead),
+                          ('tbody', legacy_tbody), ('tr', legacy_tr)):
+        converter.register_handler(name, handler, convert_children=False)
+    return converter
+
+
+def comparison_table(rows, columns=5):
+    # A Gemini-style comparison table: short text, inline code and bold cells
+    head = ''.join(f'<th>Columna {c}</th>' for c in range(columns))
+    body = ''.join(
+        '<tr>' + ''.join(f'<td>Valor <b>{r}.{c}</b> con <code>x_{c}</code></td>' for c in range(columns)) + '</tr>'
+        for r in range(rows))
+    return f'<table><thead><tr>{head}</tr></thead><tbody>{body}</tbody></table>'
+
+
+def best_of(runs, fn):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    html = comparison_table(args.rows)
+    current = EnhancedMarkdownConverter()
+    soup = current._preprocess_html(html)
+    cells = len(soup.find_all(['th', 'td']))
+    legacy = legacy_converter()
+    before = best_of(args.runs, lambda: legacy._convert_node(soup))
+    after = best_of(args.runs, lambda: current._convert_node(soup))
+    print(f'{args.rows} rows, {cells} cells, {len(html) / 1e3:.0f} kB of HTML; preprocessing excluded')
+    print(f'legacy handlers: {before * 1000:8.1f} ms  {before / cells * 1e6:6.1f} µs/cell')
+    print(f'table engine:    {after * 1000:8.1f} ms  {after / cells * 1e6:6.1f} µs/cell  ({before / after:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+import re
+from functools import lru_cache
+from itertools import compress, count
+from operator import itemgetter, sub
+
+CLASS_LANGUAGE_PREFIXES = ('language-', 'lang-')
+# Names in Gemini's code-block header that differ from the fence info string
+HEADER_LANGUAGE_ALIASES = {
+    'c++': 'cpp', 'c#': 'csharp', 'f#': 'fsharp', 'objective-c': 'objectivec',
+    'shell': 'bash', 'sh': 'bash', 'zsh': 'bash', 'powershell': 'powershell',
+    'plain text': '', 'plaintext': '', 'text': '', 'code': '', 'code snippet': '',
+}
+FENCE_INFO = re.compile(r'[\w+#.-]+')
+
+# Only the start of a block is inspected when guessing its language
+GUESS_LINES = 20
+LANGUAGE_HINTS = [
+    ('php', re.compile(r'^\s*<\?php')),
+    ('html', re.compile(r'^\s*<(?:!doctype|html|head|body|div|span|p|script|style)\b', re.IGNORECASE)),
+    ('json', re.compile(r'^\s*[{\[]\s*"[^"\n]*"\s*:')),
+    ('python', re.compile(r'^\s*#!.*\bpython', re.MULTILINE)),
+    ('bash', re.compile(r'^\s*#!.*\b(?:ba)?sh\b', re.MULTILINE)),
+    ('python', re.compile(r'^\s*(?:def \w+\(.*\)\s*(?:->.*)?:|class \w+(?:\(.*\))?:|from [\w.]+ import |'
+                          r'import [\w.]+(?: as \w+)?\s*$|if __name__ ==)', re.MULTILINE)),
+    ('cpp', re.compile(r'^\s*#include\s*[<"]', re.MULTILINE)),
+    ('java', re.compile(r'^\s*public\s+(?:static\s+)?(?:final\s+)?(?:class|interface|void)\b', re.MULTILINE)),
+    ('javascript', re.compile(r'^\s*(?:(?:const|let|var)\s+\w+\s*=|function\s*\w*\s*\(|import .* from [\'"]|'
+                              r'console\.log\()', re.MULTILINE)),
+    ('sql', re.compile(r'^\s*(?:SELECT\s.+\sFROM|INSERT INTO|UPDATE\s+\w+\s+SET|DELETE FROM|CREATE TABLE)\b',
+                       re.MULTILINE | re.IGNORECASE)),
+    ('bash', re.compile(r'^\s*(?:\$ |sudo |apt(?:-get)? |pip3? install |npm |git |cd |echo |export \w+=)', re.MULTILINE)),
+]
+
+
+def normalize_code(text, prefix=''):
+    """Dedents a code block, trims its blank edges and prefixes its lines.
+
+    Every line is rstripped, leading and trailing blank lines are dropped and
+    the smallest indentation of the non-blank lines is removed; `prefix` then
+    starts every remaining line, blank ones included. Each step maps a str
+    method over the whole list of lines, so the per-line work runs in C
+    rather than in a Python loop, and the indentation pass is skipped when
+    the first line is not indented, as in most code Gemini writes.
+    """
+    lines = list(map(str.rstrip, text.splitlines()))
+    # Blank lines are '' now, which compress() skips
+    start = next(compress(count(), lines), None)
+    if start is None:
+        return ''
+    lines = lines[start:len(lines) - next(compress(count(), reversed(lines)))]
+    if lines[0][0].isspace():
+        content = list(map(str.lstrip, lines))
+        indent = min(compress(map(sub, map(len, lines), map(len, content)), content))
+        lines = map(itemgetter(slice(indent, None)), lines)
+    return prefix + ('\n' + prefix).join(lines)
+
+
+@lru_cache(maxsize=None)
+def class_language(classes):
+    """Fence language from a tuple of class names such as 'language-python', or ''."""
+    for name in classes:
+        for prefix in CLASS_LANGUAGE_PREFIXES:
+            if name.startswith(prefix):
+                return name[len(prefix):]
+    return ''
+
+
+@lru_cache(maxsize=None)
+def header_language(label):
+    """Fence language for the name shown in a Gemini code-block header ('Python', 'C++')."""
+    name = ' '.join(label.split()).lower()
+    name = HEADER_LANGUAGE_ALIASES.get(name, name)
+    return name if FENCE_INFO.fullmatch(name) else ''
+
+
+def guess_language(code):
+    """Best-effort language of an unlabelled block from a few telltale lines, or ''."""
+    cut = -1
+    for _ in range(GUESS_LINES):
+        cut = code.find('\n', cut + 1)
+        if cut < 0:
+            break
+    head = code if cut < 0 else code[:cut]
+    for language, pattern in LANGUAGE_HINTS:
+        if pattern.search(head):
+            return language
+    return ''
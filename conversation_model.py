@@ -0,0 +1,95 @@
+from enum import Enum
+
+
+class Speaker(str, Enum):
+    """Who wrote a message. Members compare equal to their label ('Tú', 'Gemini')."""
+    USER = 'Tú'
+    GEMINI = 'Gemini'
+
+    def __str__(self):
+        return self.value
+
+
+class Message:
+    """One turn of a conversation.
+
+    `position` is the turn number (from 0) among the document's non-empty
+    messages, when the extractor knows it. `source` is where the message's
+    container starts in the HTML file as (line, column), the way html.parser
+    reports it, or None. Messages hold no reference to the parse tree, so the
+    tree can be freed as soon as they are extracted.
+
+    Equality ignores `source`: positions depend on the parser backend, and
+    lxml records none.
+    """
+    __slots__ = ('speaker', 'content', 'position', 'source')
+
+    def __init__(self, speaker, content, position=None, source=None):
+        self.speaker = Speaker(speaker)
+        self.content = content
+        self.position = position
+        self.source = source
+
+    def _key(self):
+        return (self.speaker, self.content, self.position)
+
+    def __eq__(self, other):
+        if not isinstance(other, Message):
+            return NotImplemented
+        return self._key() == other._key()
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'Message({self.speaker.value!r}, {self.content[:40]!r}, position={self.position}, source={self.source})'
+
+    def as_dict(self):
+        return {'speaker': self.speaker.value, 'content': self.content,
+                'position': self.position, 'source': self.source}
+
+
+class Conversation:
+    """The messages extracted from one file, in document order.
+
+    Behaves as a read/append sequence of Message objects; `title` is the
+    document's <title> text when the extractor read it.
+    """
+    __slots__ = ('messages', 'title')
+
+    def __init__(self, messages=(), title=None):
+        self.messages = list(messages)
+        self.title = title
+
+    def append(self, message):
+        self.messages.append(message)
+
+    def speakers(self):
+        return {message.speaker for message in self.messages}
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __getitem__(self, index):
+        return self.messages[index]
+
+    def __eq__(self, other):
+        if isinstance(other, Conversation):
+            return self.messages == other.messages and self.title == other.title
+        if isinstance(other, list):
+            return self.messages == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'Conversation({len(self.messages)} messages, title={self.title!r})'
+
+
+def element_source(element):
+    """(line, column) of a parsed element's start tag, or None when the parser
+    does not record positions (lxml, selectolax)."""
+    line = getattr(element, 'sourceline', None)
+    return None if line is None else (line, element.sourcepos)
@@ -0,0 +1,95 @@
+import hashlib
+import json
+import os
+
+MANIFEST_NAME = '.gemini2md-manifest.json'
+MANIFEST_FORMAT = 1
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionManifest:
+    """On-disk record of what each output was converted from.
+
+    Every entry stores the input's size, mtime and SHA-256 plus the converter
+    version and options used. A file whose size and mtime are unchanged is
+    skipped after a single stat(); when the stat differs the content hash
+    decides, so a touched-but-identical file is not reconverted either.
+    Changing the converter version or the options invalidates every entry.
+    """
+
+    def __init__(self, path, converter_version, options, input_root=None):
+        self.path = path
+        # Outputs are keyed relative to the manifest, inputs relative to `input_root`
+        self.root = os.path.dirname(os.path.abspath(path))
+        self.input_root = os.path.abspath(input_root) if input_root else self.root
+        self.converter_version = str(converter_version)
+        self.options = json.dumps(options, sort_keys=True)
+        self.entries = {}
+        self._hashes = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path, converter_version, options, input_root=None):
+        manifest = cls(path, converter_version, options, input_root)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('format') == MANIFEST_FORMAT:
+                manifest.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            pass
+        return manifest
+
+    def _key(self, input_path):
+        return os.path.relpath(os.path.abspath(input_path), self.input_root)
+
+    def _output_key(self, output_path):
+        return os.path.relpath(os.path.abspath(output_path), self.root)
+
+    def is_up_to_date(self, input_path, output_path):
+        entry = self.entries.get(self._key(input_path))
+        if (not entry or entry.get('converter') != self.converter_version
+                or entry.get('options') != self.options or entry.get('output') != self._output_key(output_path)
+                or not os.path.exists(output_path)):
+            return False
+        st = os.stat(input_path)
+        if entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            return True
+        if entry['size'] != st.st_size:
+            return False
+        digest = self._hashes[input_path] = file_sha256(input_path)
+        if digest != entry['sha256']:
+            return False
+        # Same content with a new mtime: remember the new stat so the next run is stat-only again
+        entry['mtime_ns'] = st.st_mtime_ns
+        self._dirty = True
+        return True
+
+    def record(self, input_path, output_path):
+        st = os.stat(input_path)
+        digest = self._hashes.pop(input_path, None) or file_sha256(input_path)
+        self.entries[self._key(input_path)] = {
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'sha256': digest,
+            'converter': self.converter_version,
+            'options': self.options,
+            'output': self._output_key(output_path),
+        }
+        self._dirty = True
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'format': MANIFEST_FORMAT, 'entries': self.entries}, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
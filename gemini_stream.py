@@ -0,0 +1,161 @@
+from collections import deque
+
+from bs4 import BeautifulSoup
+from bs4.builder._htmlparser import BeautifulSoupHTMLParser
+
+from conversation_model import Message, element_source
+from markdown_enhancer import EnhancedMarkdownConverter
+from message_cache import get_default_cache
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+
+def message_speaker(name, attrs):
+    """Returns the speaker of a message container start tag, or None.
+
+    `attrs` is the (name, value) list produced by html.parser; later duplicates
+    win, as they do when BeautifulSoup builds the tree.
+    """
+    if name == 'div':
+        element_id = dict(attrs).get('id') or ''
+        if element_id.startswith('model-response-message-contentr_'):
+            return 'Gemini'
+    elif name == 'p':
+        if 'query-text-line' in (dict(attrs).get('class') or '').split():
+            return 'Tú'
+    return None
+
+
+class GeminiStreamParser(BeautifulSoupHTMLParser):
+    """Incremental html.parser front end that only builds message subtrees.
+
+    Outside `model-response-message-contentr_*` containers and `query-text-line`
+    paragraphs every event is dropped as soon as it is tokenized, so inlined
+    stylesheets, fonts and data: URIs never become tree nodes. Inside a message,
+    events go to a throwaway BeautifulSoup exactly as they would when parsing the
+    whole document, so each subtree matches the one found by
+    `extract_gemini_conversation_singlepage`. Finished messages are queued in
+    `messages` as (speaker, Tag) pairs and the <title> text is kept in `title`.
+    """
+
+    def __init__(self):
+        self._idle_soup = BeautifulSoup('', 'html.parser')
+        super().__init__(self._idle_soup, convert_charrefs=False)
+        self.messages = deque()
+        self.title = None
+        self._in_title = False
+        self._open_tags = []
+        self._fragment = None
+        self._speaker = None
+
+    def _start_message(self, speaker):
+        self._fragment = BeautifulSoup('', 'html.parser')
+        self._speaker = speaker
+        self.soup = self._fragment
+
+    def _finish_message(self):
+        fragment = self._fragment
+        fragment.endData()
+        while fragment.currentTag is not fragment:
+            fragment.popTag()
+        self.messages.append((self._speaker, fragment.contents[0]))
+        self._fragment = None
+        self._speaker = None
+        self.soup = self._idle_soup
+
+    def _pop_open_tag(self, name):
+        # Same rule as BeautifulSoup._popToTag: close the most recent open
+        # tag with this name, or nothing if there is none.
+        for i in range(len(self._open_tags) - 1, -1, -1):
+            if self._open_tags[i] == name:
+                del self._open_tags[i:]
+                return True
+        return False
+
+    def handle_starttag(self, tag, attrs, handle_empty_element=True):
+        if self._fragment is None:
+            speaker = message_speaker(tag, attrs)
+            if not speaker:
+                if tag == 'title' and self.title is None:
+                    self._in_title = True
+                    self.title = ''
+                if handle_empty_element and self.soup.builder.can_be_empty_element(tag):
+                    self.already_closed_empty_element.append(tag)
+                else:
+                    self._open_tags.append(tag)
+                return
+            self._start_message(speaker)
+        super().handle_starttag(tag, attrs, handle_empty_element)
+
+    def handle_endtag(self, tag, check_already_closed=True):
+        if check_already_closed and tag in self.already_closed_empty_element:
+            self.already_closed_empty_element.remove(tag)
+        elif self._fragment is None:
+            if tag == 'title':
+                self._in_title = False
+            self._pop_open_tag(tag)
+        elif tag in self._open_tags and not self._fragment.open_tag_counter.get(tag):
+            # The end tag closes an ancestor of the container, and with it
+            # the container itself.
+            self._finish_message()
+            self._pop_open_tag(tag)
+        else:
+            # Unmatched end tags are still handed over: they end the current
+            # text node, just like in the full tree.
+            self._fragment.handle_endtag(tag)
+            if self._fragment.currentTag is self._fragment:
+                self._finish_message()
+
+    def handle_data(self, data):
+        if self._fragment is not None:
+            self.soup.handle_data(data)
+        elif self._in_title:
+            self.title += data
+
+    def handle_comment(self, data):
+        if self._fragment is not None: super().handle_comment(data)
+
+    def handle_decl(self, decl):
+        if self._fragment is not None: super().handle_decl(decl)
+
+    def unknown_decl(self, data):
+        if self._fragment is not None: super().unknown_decl(data)
+
+    def handle_pi(self, data):
+        if self._fragment is not None: super().handle_pi(data)
+
+    def close(self):
+        super().close()
+        if self._fragment is not None:
+            self._finish_message()
+
+
+def iter_message_elements_streaming(html_file, chunk_size=DEFAULT_CHUNK_SIZE, parser=None):
+    """Yields (speaker, Tag) for each message, reading `html_file` in chunks.
+
+    Only the subtree of the message being yielded is alive at any time.
+    Pass a `GeminiStreamParser` as `parser` to read its `title` afterwards.
+    """
+    parser = parser or GeminiStreamParser()
+    with open(html_file, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            while parser.messages:
+                yield parser.messages.popleft()
+    parser.close()
+    while parser.messages:
+        yield parser.messages.popleft()
+
+
+def iter_gemini_messages_streaming(html_file, converter=None, chunk_size=DEFAULT_CHUNK_SIZE, parser=None):
+    """Streaming counterpart of `main.iter_gemini_messages`."""
+    converter = converter or EnhancedMarkdownConverter(cache=get_default_cache())
+    position = 0
+    for speaker, element in iter_message_elements_streaming(html_file, chunk_size, parser):
+        content = converter.convert_element(element)
+        if content and content.strip():
+            yield Message(speaker, content, position, element_source(element))
+            position += 1
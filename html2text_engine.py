@@ -0,0 +1,48 @@
+import threading
+
+try:
+    import html2text
+except ImportError:
+    html2text = None
+
+_local = threading.local()
+
+
+def html2text_available():
+    return html2text is not None
+
+
+# Options applied on top of HTML2Text's defaults
+CONVERTER_OPTIONS = {'ignore_links': False}
+
+
+def _configure(converter):
+    converter.__init__()
+    for name, value in CONVERTER_OPTIONS.items():
+        setattr(converter, name, value)
+    return converter
+
+
+def get_html2text_converter():
+    """Returns this thread's HTML2Text instance, creating it on first use.
+
+    HTML2Text is an HTMLParser subclass and keeps its parse state on the
+    instance, so one converter is shared per thread rather than per process.
+    """
+    converter = getattr(_local, 'converter', None)
+    if converter is None:
+        converter = _local.converter = html2text.HTML2Text()
+    return converter
+
+
+def html2text_to_markdown(html):
+    """Converts an HTML fragment with this thread's converter.
+
+    HTML2Text keeps per-document state that its output does not reset (a
+    table leaves its line-break marker set, for one), so the converter is
+    re-initialised with CONVERTER_OPTIONS before every fragment: each call
+    converts as a new HTML2Text would, without allocating one.
+    """
+    if html2text is None:
+        raise ImportError("html2text is not installed")
+    return _configure(get_html2text_converter()).handle(html)
@@ -0,0 +1,90 @@
+import re
+
+
+def _trie_pattern(keywords):
+    # Alternation shaped like a trie: keywords sharing a prefix share its
+    # branch, so at each offset the regex engine follows a single path through
+    # the keyword set instead of retrying every keyword from scratch
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # A keyword ending here makes the rest optional; the greedy match is the longest
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+def _can_hide_labels(match_labels):
+    # Whether a match could swallow the start of another keyword with labels
+    # of its own: `b` starts inside `a`, past its first character
+    for a, a_labels in match_labels.items():
+        for b, b_labels in match_labels.items():
+            if b_labels <= a_labels:
+                continue
+            for offset in range(1, len(a)):
+                tail = a[offset:]
+                if b.startswith(tail) or tail.startswith(b):
+                    return True
+    return False
+
+
+class KeywordMatcher:
+    """Finds which groups of keywords occur in a text, in a single scan.
+
+    `groups` maps a label to its keywords, in priority order. All keywords are
+    compiled into one trie-shaped regex and the lowercased text is scanned
+    once, left to right. As with an Aho–Corasick automaton, no occurrence is
+    missed: when one keyword can overlap another with a different label, the
+    pattern is wrapped in a lookahead so that every offset is reported. The
+    scan runs in the regex engine's C loop, which in CPython is several times
+    faster than stepping through an automaton one character at a time.
+    """
+
+    def __init__(self, groups):
+        self.labels = tuple(groups)
+        keyword_labels = {}
+        for label, keywords in groups.items():
+            for keyword in keywords:
+                keyword_labels.setdefault(keyword.lower(), set()).add(label)
+        # A match is the longest keyword at its offset; it also stands for
+        # every shorter keyword that is a prefix of it
+        self._match_labels = {
+            keyword: frozenset(label for prefix, labels in keyword_labels.items()
+                               if keyword.startswith(prefix) for label in labels)
+            for keyword in keyword_labels
+        }
+        alternation = _trie_pattern(keyword_labels)
+        if _can_hide_labels(self._match_labels):
+            # Report a match at every offset, overlapping ones included
+            self.pattern = re.compile(f'(?=({alternation}))')
+        else:
+            # Consumed matches cannot hide a label, and a plain pattern lets the
+            # regex engine skip ahead to candidate first characters
+            self.pattern = re.compile(f'({alternation})')
+
+    def find(self, text):
+        """Returns the set of labels with at least one keyword in `text`."""
+        found = set()
+        for match in self.pattern.finditer(text.lower()):
+            found |= self._match_labels[match.group(1)]
+            if len(found) == len(self.labels):
+                break
+        return found
+
+    def classify(self, text):
+        """Returns the highest-priority label found in `text`, or None."""
+        found = set()
+        for match in self.pattern.finditer(text.lower()):
+            found |= self._match_labels[match.group(1)]
+            if self.labels[0] in found:
+                return self.labels[0]
+        return next((label for label in self.labels if label in found), None)
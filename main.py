@@ -1,10 +1,29 @@
 import os
-from bs4 import BeautifulSoup, NavigableString, Tag
+import hashlib
+import fnmatch
+from bs4 import NavigableString, Tag
 import re
-from markdown_enhancer import EnhancedMarkdownConverter
+from markdown_enhancer import CONVERTER_VERSION, EnhancedMarkdownConverter
+from conversion_manifest import MANIFEST_NAME, ConversionManifest
+from gemini_stream import GeminiStreamParser, iter_gemini_messages_streaming
+from keyword_matcher import KeywordMatcher
+from conversation_model import Conversation, Message, Speaker, element_source
+from html2text_engine import html2text_available, html2text_to_markdown
+from message_cache import MessageCache, get_default_cache, set_default_cache
+from message_locator import advance_position, locate_message_spans, locate_title, open_html_map, probe_html
+from pandoc_backend import PandocError, PandocPool, pandoc_available, pandoc_to_markdown
+from parser_backends import KNOWN_BACKENDS, get_default_backend, make_soup, set_default_backend
 from datetime import datetime
-import subprocess
 import argparse
+import sys
+import time
+import io
+import bisect
+import itertools
+import functools
+from collections import Counter, deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 def html_to_markdown_basic(element):
     if isinstance(element, NavigableString):
@@ -77,24 +96,30 @@ def html_to_markdown_basic(element):
         return ''
 
 
-def convert_to_gemini_markdown(html_file):
-    try:
-        with open(html_file, 'r', encoding='utf-8') as f:
-            html_content = f.read()
-        
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        conversation = extract_gemini_conversation_singlepage(html_file)
-        print(f"📊 Extraídos {len(conversation)} mensajes de {html_file}")
-        
-        # Extraer metadatos
-        title = soup.title.string if soup.title else os.path.basename(html_file).replace('.html', '')
-        date_match = re.search(r'(\d{1,2}[_/]\d{1,2}[_/]\d{2,4})', html_file)
-        date_str = date_match.group(1).replace('_', '/') if date_match else datetime.now().strftime("%Y-%m-%d")
-        
-        # Generar Markdown
-        markdown = f"""# 💬 {title}
-**📅 Fecha de conversación:** {date_str}  
+def load_gemini_document(html_file, backend=None):
+    """Lee y parsea un export SingleFile una única vez.
+
+    El árbol resultante se comparte entre la extracción de metadatos, la de
+    mensajes y el renderizado, de modo que cada archivo se parsea solo una vez.
+    `backend` elige el parser (ver parser_backends); por defecto, el configurado
+    con --parser.
+    """
+    with open(html_file, 'r', encoding='utf-8') as f:
+        return make_soup(f.read(), backend)
+
+# Fecha en el nombre que SingleFile da al archivo, p. ej. "chat (18_6_2025).html"
+DATE_PATTERN = re.compile(r'(\d{1,2}[_/]\d{1,2}[_/]\d{2,4})')
+
+def extract_conversation_metadata(html_file, title=None):
+    # `title` es el texto del <title> del documento, si lo hay
+    title = title or os.path.basename(html_file).replace('.html', '')
+    date_match = DATE_PATTERN.search(html_file)
+    date_str = date_match.group(1).replace('_', '/') if date_match else datetime.now().strftime("%Y-%m-%d")
+    return {'title': title, 'date': date_str}
+
+def render_gemini_header(metadata):
+    return f"""# 💬 {metadata['title']}
+**📅 Fecha de conversación:** {metadata['date']}  
 **🔄 Exportado:** {datetime.now().strftime("%Y-%m-%d %H:%M")}  
 
 <style>
@@ -124,150 +149,364 @@ def convert_to_gemini_markdown(html_file):
 
 <div class="chat-container">
 """
-        for msg in conversation:
-            bubble_class = "user-message" if msg['speaker'] == "Tú" else "bot-message"
-            markdown += f"""<div class="{bubble_class}">
-<strong>{msg['speaker']}:</strong><br>
-{msg['content']}
+
+def render_gemini_bubble(msg):
+    bubble_class = "user-message" if msg.speaker == Speaker.USER else "bot-message"
+    return f"""<div class="{bubble_class}">
+<strong>{msg.speaker}:</strong><br>
+{msg.content}
 </div>
 
 """
-            
-        markdown += "\n</div>"
-        return markdown
+
+GEMINI_FOOTER = "\n</div>"
+
+def write_gemini_markdown(messages, metadata, out):
+    """Escribe la conversación en `out` (un archivo o cualquier objeto con
+    write()) según van llegando los mensajes, y devuelve cuántos escribió.
+
+    Con un generador de mensajes solo hay uno en memoria a la vez.
+    """
+    out.write(render_gemini_header(metadata))
+    count = 0
+    for msg in messages:
+        out.write(render_gemini_bubble(msg))
+        count += 1
+    out.write(GEMINI_FOOTER)
+    return count
+
+def render_gemini_markdown(conversation, metadata):
+    buffer = io.StringIO()
+    write_gemini_markdown(conversation, metadata, buffer)
+    return buffer.getvalue()
+
+# Formas de leer un HTML: árbol completo, lectura incremental o escaneo de bytes
+READERS = ['tree', 'stream', 'scan']
+
+def stream_gemini_markdown(html_file, out, reader='tree', dedup='global'):
+    """Convierte `html_file` escribiendo el Markdown en `out` a medida que se
+    extraen los mensajes. Devuelve el número de mensajes; los errores se
+    propagan al llamador. `dedup` es el alcance de `unique_messages`.
+    """
+    if reader == 'scan':
+        # Solo se decodifican y parsean los tramos de bytes de cada mensaje
+        with open_html_map(html_file) as buffer:
+            messages = convert_message_elements(iter_message_elements_located(buffer))
+            return _write_conversation(html_file, out, messages, lambda: load_located_title(buffer), dedup)
+    if reader == 'stream':
+        # Modo incremental: solo se construyen los subárboles de los mensajes
+        parser = GeminiStreamParser()
+        messages = iter_gemini_messages_streaming(html_file, parser=parser)
+        return _write_conversation(html_file, out, messages, lambda: parser.title, dedup)
+    if reader != 'tree':
+        raise ValueError(f"Unknown reader '{reader}'. Choose one of: {', '.join(READERS)}")
+    # Un único parseo del documento, compartido por todas las etapas
+    soup = load_gemini_document(html_file)
+    return _write_conversation(html_file, out, iter_gemini_messages(soup),
+                               lambda: soup.title.string if soup.title else None, dedup)
+
+def _write_conversation(html_file, out, messages, get_title, dedup='global'):
+    messages = unique_messages(messages, dedup)
+    # La cabecera necesita el <title>, que en modo incremental solo se conoce
+    # tras leer el <head>: se adelanta el primer mensaje antes de escribirla
+    first = next(messages, None)
+    metadata = extract_conversation_metadata(html_file, get_title())
+    pending = [first] if first is not None else []
+    count = write_gemini_markdown(itertools.chain(pending, messages), metadata, out)
+    print(f"📊 Extraídos {count} mensajes de {html_file}")
+    return count
+
+def convert_to_gemini_markdown(html_file, reader='tree', dedup='global'):
+    try:
+        buffer = io.StringIO()
+        stream_gemini_markdown(html_file, buffer, reader=reader, dedup=dedup)
+        return buffer.getvalue()
         
     except Exception as e:
         print(f"⚠️ Error procesando {html_file}: {str(e)}")
         return None
 
 def extract_conversation_with_pandoc(html_file):
-    # Check if pandoc is installed
-    try:
-        subprocess.run(['pandoc', '--version'], check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-    except (subprocess.CalledProcessError, FileNotFoundError):
+    if not pandoc_available():
         print("⚠️ pandoc no está instalado. Por favor, instálalo con 'sudo apt install pandoc'")
-        return []
-    
-    # Convert HTML to Markdown
-    markdown_file = html_file.replace('.html', '.md')
-    subprocess.run(['pandoc', html_file, '-o', markdown_file], check=True)
-    
-    # Read the Markdown content
-    with open(markdown_file, 'r', encoding='utf-8') as f:
-        markdown_content = f.read()
-    
-    # Split into messages by looking for patterns
-    # Example: **Tú:** or **Gemini:**
-    pattern = r'\*\*(Tú|Gemini):\*\*'
-    messages = re.split(pattern, markdown_content)
-    
-    # The first part is before the first speaker, so we skip it
-    conversation = []
-    for i in range(1, len(messages), 2):
-        speaker = messages[i].strip()
-        content = messages[i+1].strip()
-        conversation.append({
-            'speaker': speaker,
-            'content': content
-        })
-    
-    return conversation
-
-def extract_conversation_with_html2text(html_file):
-    try:
-        import html2text
-    except ImportError:
-        print("⚠️ html2text no está instalado. Por favor, instálalo con 'pip install html2text'")
-        return []
+        return Conversation()
     
+    # Convert HTML to Markdown through pandoc's stdin/stdout, without a .md on disk
     with open(html_file, 'r', encoding='utf-8') as f:
         html_content = f.read()
+    try:
+        markdown_content = pandoc_to_markdown(html_content)
+    except PandocError as e:
+        print(f"⚠️ Error procesando {html_file}: {e}")
+        return Conversation()
     
-    # Convert HTML to Markdown
-    text_maker = html2text.HTML2Text()
-    text_maker.ignore_links = False
-    markdown_content = text_maker.handle(html_content)
-    
-    # Split into messages by looking for patterns
-    # Example: **Tú:** or **Gemini:**
-    pattern = r'\*\*(Tú|Gemini):\*\*'
-    messages = re.split(pattern, markdown_content)
+    return split_speaker_markdown(markdown_content)
+
+def iter_conversations_with_pandoc(html_files, jobs=4):
+    """Como `extract_conversation_with_pandoc` para muchos archivos, con hasta
+    `jobs` procesos de pandoc a la vez. Produce pares (archivo, conversación)
+    en el orden de entrada; un archivo que pandoc no puede convertir da una
+    conversación vacía.
+    """
+    if not pandoc_available():
+        print("⚠️ pandoc no está instalado. Por favor, instálalo con 'sudo apt install pandoc'")
+        return
+    html_files = list(html_files)
+
+    def read_all():
+        for html_file in html_files:
+            with open(html_file, 'r', encoding='utf-8') as f:
+                yield f.read()
+
+    with PandocPool(max_workers=jobs) as pool:
+        for html_file, markdown_content in zip(html_files, pool.map(read_all())):
+            if isinstance(markdown_content, PandocError):
+                print(f"⚠️ Error procesando {html_file}: {markdown_content}")
+                yield html_file, Conversation()
+            else:
+                yield html_file, split_speaker_markdown(markdown_content)
+
+# Marcadores de turno en el Markdown que generan pandoc y html2text: **Tú:** o **Gemini:**
+SPEAKER_MARKER_PATTERN = re.compile(r'\*\*(Tú|Gemini):\*\*')
+
+def iter_speaker_markdown(markdown_content):
+    """Produce los mensajes de `markdown_content` según se encuentran sus
+    marcadores, sin partir antes todo el texto. Lo anterior al primer marcador
+    se descarta.
+    """
+    previous = None
+    for match in SPEAKER_MARKER_PATTERN.finditer(markdown_content):
+        if previous is not None:
+            yield Message(previous.group(1), markdown_content[previous.end():match.start()].strip())
+        previous = match
+    if previous is not None:
+        yield Message(previous.group(1), markdown_content[previous.end():].strip())
+
+def split_speaker_markdown(markdown_content):
+    return Conversation(iter_speaker_markdown(markdown_content))
+
+def iter_messages_with_html2text(elements):
+    """Como `convert_message_elements`, pero convirtiendo cada mensaje con
+    html2text. Solo se le pasa el subárbol del mensaje, no la página entera.
+    """
+    position = 0
+    for speaker, element in elements:
+        # Solo se quitan líneas en blanco delante: la sangría del primer elemento de lista es suya
+        content = html2text_to_markdown(str(element)).lstrip('\n').rstrip()
+        if content:
+            yield Message(speaker, content, position, element_source(element))
+            position += 1
+
+def extract_conversation_with_html2text(html_file, backend=None, dedup='global'):
+    if not html2text_available():
+        print("⚠️ html2text no está instalado. Por favor, instálalo con 'pip install html2text'")
+        return Conversation()
     
-    # The first part is before the first speaker, so we skip it
-    conversation = []
-    for i in range(1, len(messages), 2):
-        speaker = messages[i].strip()
-        content = messages[i+1].strip()
-        conversation.append({
-            'speaker': speaker,
-            'content': content
-        })
+    with open_html_map(html_file) as buffer:
+        # En exports de Gemini solo se convierten los subárboles de los mensajes
+        conversation = Conversation(unique_messages(iter_messages_with_html2text(
+            iter_message_elements_located(buffer, backend)), dedup))
+        if conversation:
+            return conversation
+        html_content = buffer[:].decode('utf-8')
     
-    return conversation
+    # Si no, se convierte la página entera y se parte por los marcadores de turno
+    return split_speaker_markdown(html2text_to_markdown(html_content))
 
-def extract_gemini_conversation_singlepage(html_file):
-    with open(html_file, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
-    
-    message_elements_with_speaker = []
-
-    # 1. Extract Gemini responses
-    # Find all potential message containers in document order
-    # This includes the main div for Gemini responses and the p tags for user queries
-    all_potential_message_elements = soup.find_all(lambda tag:
-        (tag.name == 'div' and tag.has_attr('id') and tag['id'].startswith('model-response-message-contentr_')) or
-        (tag.name == 'p' and 'query-text-line' in tag.get('class', []))
-    )
-
-    print(f"DEBUG: Found {len(all_potential_message_elements)} total potential message elements.")
-
-    for element in all_potential_message_elements:
-        speaker = None
-        content = ""
-
-        if element.name == 'div' and element.has_attr('id') and element['id'].startswith('model-response-message-contentr_'):
-            speaker = 'Gemini'
-            # Pass the entire container to the new converter
-            converter = EnhancedMarkdownConverter()
-            # We need to pass the HTML string of the element
-            content = converter.convert(element.prettify())
-        elif element.name == 'p' and 'query-text-line' in element.get('class', []):
-            speaker = 'Tú'
-            converter = EnhancedMarkdownConverter()
-            content = converter.convert(element.prettify())
-
-        if speaker and content and content.strip():
-            message_elements_with_speaker.append({
-                'speaker': speaker,
-                'content': content,
-                'original_element': element # Keep original element for debugging if needed, but not for sorting
-            })
-
-    # Sort all collected messages by their original position in the document
-    all_elements_in_order = list(soup.find_all(True))
-    element_to_index = {el: i for i, el in enumerate(all_elements_in_order)}
-
-    message_elements_with_speaker.sort(key=lambda x: element_to_index.get(x['original_element'], float('inf')))
+def _message_speaker(tag):
+    if tag.name == 'div' and tag.has_attr('id') and tag['id'].startswith('model-response-message-contentr_'):
+        return 'Gemini'
+    if tag.name == 'p' and 'query-text-line' in tag.get('class', []):
+        return 'Tú'
+    return None
+
+def iter_message_elements(soup):
+    """Recorre el documento en orden y produce (speaker, elemento) por mensaje.
+
+    Los contenedores de respuestas de Gemini (`model-response-message-contentr_*`)
+    y las líneas de consulta del usuario (`query-text-line`) salen ya en orden de
+    documento, sin construir ningún índice de todo el árbol. El subárbol de un
+    mensaje no se vuelve a recorrer: el conversor ya se encarga de él.
+    """
+    stack = [iter(soup.contents)]
+    while stack:
+        for node in stack[-1]:
+            if not isinstance(node, Tag):
+                continue
+            speaker = _message_speaker(node)
+            if speaker:
+                yield speaker, node
+            elif node.contents:
+                stack.append(iter(node.contents))
+                break
+        else:
+            stack.pop()
+
+LOCATED_BATCH_BYTES = 256 * 1024
+
+def load_located_title(buffer, backend=None):
+    title = locate_title(buffer)
+    if title is None:
+        return None
+    soup = make_soup(title.decode('utf-8', 'replace'), backend)
+    return soup.title.string if soup.title else None
+
+def iter_message_elements_located(buffer, backend=None):
+    """Como `iter_message_elements`, pero sin decodificar ni parsear todo el
+    documento: `buffer` son los bytes del archivo (normalmente mapeados con
+    `open_html_map`) y solo se parsean los tramos que `locate_message_spans`
+    encuentra alrededor de cada mensaje.
+
+    Las posiciones (sourceline, sourcepos) de los elementos se traducen a las
+    del archivo completo, como si se hubiera parseado entero.
+    """
+    # Los tramos se parsean por lotes: cada uno es un elemento completo, así que
+    # concatenados dan el mismo árbol y se evita crear una sopa por mensaje
+    batch = []
+    origins = []
+    batch_size = 0
+    batch_line, batch_column = 1, 0
+    file_line, file_column, line_cursor = 1, 0, 0
+    for span in locate_message_spans(buffer):
+        text = buffer[span.start:span.end].decode('utf-8')
+        # Línea y columna se avanzan desde el tramo anterior: cada byte se mira una sola vez
+        file_line, file_column = advance_position(buffer, line_cursor, span.start, file_line, file_column)
+        line_cursor = span.start
+        # Dónde empieza el tramo en el lote y en el archivo, como (línea, columna)
+        origins.append(((batch_line, batch_column), (file_line, file_column)))
+        newlines = text.count('\n')
+        if newlines:
+            batch_line += newlines
+            batch_column = len(text) - text.rfind('\n') - 1
+        else:
+            batch_column += len(text)
+        batch.append(text)
+        batch_size += span.end - span.start
+        if batch_size >= LOCATED_BATCH_BYTES:
+            yield from _parse_located_batch(batch, origins, backend)
+            batch = []
+            origins = []
+            batch_size = 0
+            batch_line, batch_column = 1, 0
+    if batch:
+        yield from _parse_located_batch(batch, origins, backend)
+
+def _parse_located_batch(batch, origins, backend):
+    starts = [batch_start for batch_start, _ in origins]
+    for speaker, element in iter_message_elements(make_soup(''.join(batch), backend)):
+        if element.sourceline is not None:
+            position = (element.sourceline, element.sourcepos)
+            (line, column), (file_line, file_column) = origins[bisect.bisect_right(starts, position) - 1]
+            if position[0] == line:
+                element.sourceline, element.sourcepos = file_line, file_column + position[1] - column
+            else:
+                element.sourceline = file_line + position[0] - line
+        yield speaker, element
+
+def iter_gemini_messages(soup, converter=None):
+    """Produce los mensajes convertidos en orden de documento.
+
+    Cada mensaje lleva `position`, su número de turno (desde 0) dentro de la
+    secuencia de mensajes no vacíos del documento.
+    """
+    return convert_message_elements(iter_message_elements(soup), converter)
+
+def convert_message_elements(elements, converter=None):
+    converter = converter or EnhancedMarkdownConverter(cache=get_default_cache())
+    position = 0
+    for speaker, element in elements:
+        # The subtree is converted in place, without a serialize/re-parse round trip
+        content = converter.convert_element(element)
+        if content and content.strip():
+            yield Message(speaker, content, position, element_source(element))
+            position += 1
+
+# Alcance de la eliminación de duplicados: solo el mensaje anterior, los
+# últimos DEDUP_WINDOW mensajes conservados o toda la conversación
+DEDUP_SCOPES = ['adjacent', 'window', 'global']
+DEDUP_WINDOW = 64
+
+def message_digest(content):
+    # 16 bytes por mensaje, sea cual sea su longitud
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=16).digest()
+
+def unique_messages(messages, scope='global', window=DEDUP_WINDOW):
+    """Descarta los mensajes cuyo contenido repite uno ya producido.
+
+    Solo se guarda un resumen de tamaño fijo por mensaje, así que la memoria
+    depende del número de mensajes y no de su longitud; con 'adjacent' o
+    'window' está acotada. Funciona sobre cualquier iterador y produce cada
+    mensaje en cuanto llega.
+    """
+    if scope not in DEDUP_SCOPES:
+        raise ValueError(f"Unknown dedup scope '{scope}'. Choose one of: {', '.join(DEDUP_SCOPES)}")
+    if scope == 'global':
+        seen = set()
+        for msg in messages:
+            digest = message_digest(msg.content)
+            if digest not in seen:
+                seen.add(digest)
+                yield msg
+        return
+
+    recent = deque(maxlen=1 if scope == 'adjacent' else window)
+    for msg in messages:
+        digest = message_digest(msg.content)
+        # Como mucho `window` resúmenes: recorrerlos cuesta menos que mantener un set aparte
+        if digest not in recent:
+            recent.append(digest)
+            yield msg
+
+def extract_gemini_conversation_singlepage(html_file, soup=None, backend=None, dedup='global'):
+    if soup is None:
+        soup = load_gemini_document(html_file, backend)
     
-    # Clean duplicates and format final output
-    cleaned_conversation = []
-    seen_contents = set()
-    for msg in message_elements_with_speaker:
-        # A simple way to check for duplicates, might need refinement if messages are very similar
-        if msg['content'] not in seen_contents:
-            cleaned_conversation.append({'speaker': msg['speaker'], 'content': msg['content']})
-            seen_contents.add(msg['content'])
-            
-    return cleaned_conversation
+    # Los mensajes ya llegan en orden de documento: no hace falta reordenarlos
+    return Conversation(unique_messages(iter_gemini_messages(soup), dedup))
 
-def extract_conversation_combined(html_file):
-    with open(html_file, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
+def extract_gemini_conversation_streaming(html_file, parser=None, dedup='global'):
+    """Como `extract_gemini_conversation_singlepage`, pero leyendo el archivo por
+    bloques y sin construir el árbol completo del documento.
+
+    Los estilos, fuentes e imágenes incrustados por SingleFile se descartan
+    según se tokenizan, así que la memoria depende del mensaje más grande y no
+    del tamaño del archivo.
+    """
+    return Conversation(unique_messages(iter_gemini_messages_streaming(html_file, parser=parser), dedup))
+
+def extract_gemini_conversation_located(html_file, backend=None, dedup='global'):
+    """Como `extract_gemini_conversation_singlepage`, pero decodificando y
+    parseando solo los tramos de bytes de los mensajes; en páginas de SingleFile
+    llenas de recursos incrustados evita casi todo el trabajo.
+    """
+    with open_html_map(html_file) as buffer:
+        messages = convert_message_elements(iter_message_elements_located(buffer, backend))
+        return Conversation(unique_messages(messages, dedup))
+
+# Patrones y palabras clave de los extractores heurísticos, compilados una sola vez
+MAIN_CONTAINER_PATTERN = re.compile('conversation-container|chat-container')
+HISTORY_CONTAINER_PATTERN = re.compile('chat-history|conversation-container')
+TEXT_BLOCK_PATTERN = re.compile(r'(\w[\w\s.,;:!?()-]{20,})')
+USER_KEYWORDS = [
+    'tú:', 'you:', 'user:', 'enviaste', 'escribiste', 'pregunta:', 
+    'dijiste:', 'comentaste:', 'preguntaste:', 'indicaste:'
+]
+BOT_KEYWORDS = [
+    'gemini:', 'model:', 'respuesta:', 'asistente:', 'ia:', 'ai:', 
+    'yo:', 'como ia', 'como modelo', 'puedo ayudarte', 'puedo ayudarle'
+]
+TEXT_KEYWORD_MATCHER = KeywordMatcher({'Tú': USER_KEYWORDS, 'Gemini': BOT_KEYWORDS})
+SPEAKER_PREFIX_MATCHER = KeywordMatcher({'Tú': ['tú:', 'you:'], 'Gemini': ['gemini:', 'model:']})
+CONTAINER_CLASS_MATCHER = KeywordMatcher({'Tú': ['user'], 'Gemini': ['bot', 'gemini']})
+
+def extract_conversation_combined(html_file, backend=None, soup=None):
+    if soup is None:
+        soup = load_gemini_document(html_file, backend)
     
-    conversation = []
+    conversation = Conversation()
     
     # Enfoque 1: Búsqueda por contenedores principales
-    main_containers = soup.find_all(class_=re.compile('conversation-container|chat-container'))
+    main_containers = soup.find_all(class_=MAIN_CONTAINER_PATTERN)
     for container in main_containers:
         # Extraer contenido textual significativo
         content = container.get_text('\n', strip=True)
@@ -276,23 +515,14 @@ def extract_conversation_combined(html_file):
             
         # Determinar speaker por contexto
         classes = ' '.join(container.get('class', []))
-        if 'user' in classes.lower():
-            speaker = 'Tú'
-        elif 'bot' in classes.lower() or 'gemini' in classes.lower():
-            speaker = 'Gemini'
-        else:
+        speaker = CONTAINER_CLASS_MATCHER.classify(classes)
+        if speaker is None:
             # Enfoque 2: Detección por patrones lingüísticos
-            if 'tú:' in content.lower() or 'you:' in content.lower():
-                speaker = 'Tú'
-            elif 'gemini:' in content.lower() or 'model:' in content.lower():
-                speaker = 'Gemini'
-            else:
+            speaker = SPEAKER_PREFIX_MATCHER.classify(content)
+            if speaker is None:
                 continue
                 
-        conversation.append({
-            'speaker': speaker,
-            'content': content
-        })
+        conversation.append(Message(speaker, content, source=element_source(container)))
     
     return conversation
 
@@ -301,64 +531,45 @@ def extract_conversation_from_text(html_file):
         html_content = f.read()
     
     # Ajustar regex para capturar más bloques de texto
-    message_blocks = re.findall(r'(\w[\w\s.,;:!?()-]{20,})', html_content)
-    print(f"🔍 Encontrados {len(message_blocks)} bloques de texto en {html_file}")
+    message_blocks = TEXT_BLOCK_PATTERN.findall(html_content)
     
-    conversation = []
-    user_keywords = [
-        'tú:', 'you:', 'user:', 'enviaste', 'escribiste', 'pregunta:', 
-        'dijiste:', 'comentaste:', 'preguntaste:', 'indicaste:'
-    ]
-    bot_keywords = [
-        'gemini:', 'model:', 'respuesta:', 'asistente:', 'ia:', 'ai:', 
-        'yo:', 'como ia', 'como modelo', 'puedo ayudarte', 'puedo ayudarle'
-    ]
+    conversation = Conversation()
+    # Un recuento por resultado en lugar de una línea por bloque
+    counts = Counter()
     
-    for i, block in enumerate(message_blocks):
+    for block in message_blocks:
         # Saltar bloques demasiado cortos
         if len(block) < 30:
-            print(f"🚫 Bloque {i+1}: demasiado corto ({len(block)} caracteres)")
+            counts['cortos'] += 1
             continue
             
-        # Verificar palabras clave de usuario
-        if any(keyword in block.lower() for keyword in user_keywords):
-            speaker = 'Tú'
-            print(f"👤 Bloque {i+1}: identificado como usuario")
-        # Verificar palabras clave de bot
-        elif any(keyword in block.lower() for keyword in bot_keywords):
-            speaker = 'Gemini'
-            print(f"🤖 Bloque {i+1}: identificado como Gemini")
+        # Palabras clave de usuario y de bot en una sola pasada; las de usuario tienen prioridad
+        speaker = TEXT_KEYWORD_MATCHER.classify(block)
+        if speaker is not None:
+            counts['identificados'] += 1
+        elif conversation:
+            # Sin palabras clave en medio de una conversación: alternar con el último hablante
+            speaker = 'Gemini' if conversation[-1].speaker == 'Tú' else 'Tú'
+            counts['inferidos'] += 1
         else:
-            # Si no tiene palabras clave, pero estamos en medio de una conversación, intentar inferir
-            if conversation:
-                # Si el último mensaje fue del usuario, este debe ser de Gemini y viceversa
-                last_speaker = conversation[-1]['speaker']
-                if last_speaker == 'Tú':
-                    speaker = 'Gemini'
-                    print(f"🔁 Bloque {i+1}: inferido como Gemini (turno alternado)")
-                else:
-                    speaker = 'Tú'
-                    print(f"🔁 Bloque {i+1}: inferido como usuario (turno alternado)")
-            else:
-                print(f"❓ Bloque {i+1}: no se pudo determinar el hablante")
-                continue
+            counts['sin hablante'] += 1
+            continue
             
-        conversation.append({
-            'speaker': speaker,
-            'content': block
-        })
+        conversation.append(Message(speaker, block))
     
-    print(f"📋 {len(conversation)} mensajes válidos extraídos")
+    print(f"📋 {len(conversation)} mensajes válidos de {len(message_blocks)} bloques de texto en {html_file} "
+          f"({counts['identificados']} identificados, {counts['inferidos']} inferidos, "
+          f"{counts['cortos']} demasiado cortos, {counts['sin hablante']} sin hablante)")
     return conversation
 
-def extract_conversation_hybrid(html_file):
-    with open(html_file, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
+def extract_conversation_hybrid(html_file, backend=None, soup=None):
+    if soup is None:
+        soup = load_gemini_document(html_file, backend)
     
-    conversation = []
+    conversation = Conversation()
     
     # Try to find the main conversation container
-    container = soup.find(class_=re.compile('chat-history|conversation-container'))
+    container = soup.find(class_=HISTORY_CONTAINER_PATTERN)
     if not container:
         container = soup
     
@@ -374,11 +585,10 @@ def extract_conversation_hybrid(html_file):
             continue
             
         # Check if the content matches a message pattern
-        if 'tú:' in content.lower() or 'you:' in content.lower():
-            speaker = 'Tú'
+        speaker = SPEAKER_PREFIX_MATCHER.classify(content)
+        if speaker == 'Tú':
             next_speaker = 'Gemini'
-        elif 'gemini:' in content.lower() or 'model:' in content.lower():
-            speaker = 'Gemini'
+        elif speaker == 'Gemini':
             next_speaker = 'Tú'
         else:
             # If no indicators, use the expected next speaker
@@ -386,21 +596,18 @@ def extract_conversation_hybrid(html_file):
             # Flip the speaker for the next message
             next_speaker = 'Gemini' if next_speaker == 'Tú' else 'Tú'
             
-        conversation.append({
-            'speaker': speaker,
-            'content': content
-        })
+        conversation.append(Message(speaker, content, source=element_source(candidate)))
     
     return conversation
 
-def extract_conversation_targeted(html_file):
-    with open(html_file, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
+def extract_conversation_targeted(html_file, backend=None, soup=None):
+    if soup is None:
+        soup = load_gemini_document(html_file, backend)
     
-    conversation = []
+    conversation = Conversation()
     
     # Try to find the main conversation container
-    container = soup.find(class_=re.compile('chat-history|conversation-container'))
+    container = soup.find(class_=HISTORY_CONTAINER_PATTERN)
     if not container:
         container = soup
     
@@ -416,11 +623,10 @@ def extract_conversation_targeted(html_file):
             continue
             
         # Check if the content matches a message pattern
-        if 'tú:' in content.lower() or 'you:' in content.lower():
-            speaker = 'Tú'
+        speaker = SPEAKER_PREFIX_MATCHER.classify(content)
+        if speaker == 'Tú':
             next_speaker = 'Gemini'
-        elif 'gemini:' in content.lower() or 'model:' in content.lower():
-            speaker = 'Gemini'
+        elif speaker == 'Gemini':
             next_speaker = 'Tú'
         else:
             # If no indicators, use the expected next speaker
@@ -428,16 +634,128 @@ def extract_conversation_targeted(html_file):
             # Flip the speaker for the next message
             next_speaker = 'Gemini' if next_speaker == 'Tú' else 'Tú'
             
-        conversation.append({
-            'speaker': speaker,
-            'content': content
-        })
+        conversation.append(Message(speaker, content, source=element_source(candidate)))
     
     return conversation
 
-def debug_html_structure(html_file):
-    with open(html_file, 'r', encoding='utf-8') as f:
-        soup = BeautifulSoup(f.read(), 'html.parser')
+class ExtractionContext:
+    """Estado compartido entre los intentos de extracción de un archivo.
+
+    El sondeo de bytes se hace una vez y el documento se parsea como mucho una
+    vez, la primera vez que una estrategia lo pide.
+    """
+
+    def __init__(self, html_file, backend=None, dedup='global'):
+        self.html_file = html_file
+        self.backend = backend
+        self.dedup = dedup
+        self._soup = None
+        self._probe = None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = load_gemini_document(self.html_file, self.backend)
+        return self._soup
+
+    @property
+    def probe(self):
+        if self._probe is None:
+            with open_html_map(self.html_file) as buffer:
+                self._probe = probe_html(buffer)
+        return self._probe
+
+    def title(self):
+        if self._soup is not None:
+            return self._soup.title.string if self._soup.title else None
+        with open_html_map(self.html_file) as buffer:
+            return load_located_title(buffer, self.backend)
+
+def _has_messages(conversation):
+    return len(conversation) > 0
+
+def _has_both_speakers(conversation):
+    # Las heurísticas siempre encuentran "algo": solo se aceptan si hay diálogo
+    return len(conversation) >= 2 and conversation.speakers() >= {Speaker.USER, Speaker.GEMINI}
+
+def _has_explicit_dialogue(matcher):
+    """Comprobación para las heurísticas que infieren turnos alternando.
+
+    Alternar da los dos hablantes a cualquier página con dos bloques de texto,
+    así que además se exige que algún mensaje tenga un hablante explícito según
+    `matcher` (p. ej. 'Tú:' o 'Gemini:'), no solo inferido.
+    """
+    def confident(conversation):
+        return _has_both_speakers(conversation) and any(matcher.classify(m.content) for m in conversation)
+    return confident
+
+ExtractionStrategy = namedtuple('ExtractionStrategy', ['name', 'applies', 'extract', 'confident'])
+
+# De menor a mayor coste: el motor prueba en este orden y se queda con la
+# primera estrategia aplicable cuyo resultado pasa su comprobación
+EXTRACTION_STRATEGIES = [
+    # Ids y clases de Gemini presentes: solo se parsean los tramos de los mensajes
+    ExtractionStrategy('scan', lambda ctx: ctx.probe['responses'] or ctx.probe['queries'],
+                       lambda ctx: extract_gemini_conversation_located(ctx.html_file, ctx.backend, ctx.dedup), _has_messages),
+    # Heurísticas sobre el árbol completo, que se parsea una sola vez para ambas
+    ExtractionStrategy('combined', lambda ctx: ctx.probe['containers'],
+                       lambda ctx: extract_conversation_combined(ctx.html_file, soup=ctx.soup), _has_both_speakers),
+    ExtractionStrategy('targeted', lambda ctx: True,
+                       lambda ctx: extract_conversation_targeted(ctx.html_file, soup=ctx.soup),
+                       _has_explicit_dialogue(SPEAKER_PREFIX_MATCHER)),
+    # Conversores externos y, en último término, expresiones regulares sobre el texto
+    ExtractionStrategy('html2text', lambda ctx: html2text_available(),
+                       lambda ctx: extract_conversation_with_html2text(ctx.html_file, ctx.backend, ctx.dedup),
+                       _has_both_speakers),
+    ExtractionStrategy('text', lambda ctx: True,
+                       lambda ctx: extract_conversation_from_text(ctx.html_file),
+                       _has_explicit_dialogue(TEXT_KEYWORD_MATCHER)),
+    ExtractionStrategy('pandoc', lambda ctx: pandoc_available(),
+                       lambda ctx: extract_conversation_with_pandoc(ctx.html_file), _has_both_speakers),
+]
+
+def extract_conversation_auto(html_file, backend=None, strategies=None, dedup='global'):
+    """Elige el extractor más barato que probablemente funcione.
+
+    Un sondeo de bytes (ver `probe_html`) descarta las estrategias que no
+    pueden aplicarse; las demás se prueban en orden de coste y solo se pasa a
+    la siguiente si el resultado no supera su comprobación de confianza. Si
+    ninguna la supera se devuelve el primer resultado no vacío, marcado como
+    no confiable.
+
+    Devuelve un dict con `strategy`, `conversation`, `confident`, `seconds`
+    (coste del intento ganador), `title` y `attempts`, una lista de
+    (estrategia, mensajes, segundos) por cada intento.
+    """
+    ctx = ExtractionContext(html_file, backend, dedup)
+    attempts = []
+    fallback = None
+    for strategy in strategies or EXTRACTION_STRATEGIES:
+        if not strategy.applies(ctx):
+            continue
+        start = time.perf_counter()
+        conversation = strategy.extract(ctx)
+        seconds = time.perf_counter() - start
+        attempts.append((strategy.name, len(conversation), seconds))
+        result = {'strategy': strategy.name, 'conversation': conversation, 'seconds': seconds}
+        if strategy.confident(conversation):
+            result['confident'] = True
+            break
+        if conversation and fallback is None:
+            fallback = result
+    else:
+        result = fallback or {'strategy': None, 'conversation': Conversation(), 'seconds': 0.0}
+        result['confident'] = False
+    result['attempts'] = attempts
+    result['title'] = result['conversation'].title = ctx.title()
+    if result['strategy']:
+        tried = ', '.join(name for name, _, _ in attempts)
+        print(f"🏁 Estrategia '{result['strategy']}': {len(result['conversation'])} mensajes "
+              f"en {result['seconds']:.2f}s (probadas: {tried})")
+    return result
+
+def debug_html_structure(html_file, backend=None):
+    soup = load_gemini_document(html_file, backend)
     
     # Mostrar estructura básica
     print("\nEstructura del documento:")
@@ -456,45 +774,269 @@ def debug_html_structure(html_file):
         print(f"Contenido: {msg.get_text(strip=True)[:100]}...")
         print(f"Atributos: {dict(list(msg.attrs.items())[:3])}")
 
-def process_conversations_folder(input_dir):
+def convert_file(input_path, output_path, reader='tree', dedup='global'):
+    """Convierte un archivo y escribe su Markdown.
+
+    Nunca lanza excepciones: devuelve un resultado por archivo para que un HTML
+    roto no detenga el resto del lote (ni el pool de procesos). El error va en
+    el resultado; informar de él queda a cargo de quien recorre el lote.
+    """
+    result = {'input': input_path, 'output': None, 'bytes': 0, 'error': None}
     try:
-        html_files = [f for f in os.listdir(input_dir) if f.endswith('.html')]
-        if not html_files:
-            print("⚠️ No se encontraron archivos .html en el directorio de entrada")
-            print("   Coloca tus archivos SingleFile HTML en:", os.path.abspath(input_dir))
-            return
-            
-        success_count = 0
-        for html_file in html_files:
-            input_path = os.path.join(input_dir, html_file)
-            markdown = convert_to_gemini_markdown(input_path)
-            
-            if markdown:
-                output_path = os.path.join(input_dir, f"{os.path.splitext(html_file)[0]}.md")
-                with open(output_path, 'w', encoding='utf-8') as f:
-                    f.write(markdown)
-                print(f"✅ Guardado en: {output_path}")
-                success_count += 1
-        
-        print(f"\n🎉 Proceso completado: {success_count}/{len(html_files)} archivos convertidos")
-    
+        result['bytes'] = os.path.getsize(input_path)
+        os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+        # Se escribe por mensajes en un temporal y se renombra al final, para
+        # que un error a mitad no deje un .md incompleto
+        tmp_path = output_path + '.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                count = stream_gemini_markdown(input_path, f, reader=reader, dedup=dedup)
+            # Sin mensajes no es un éxito: el manifiesto no lo registra y se reintenta
+            if not count:
+                raise ValueError('no se encontró ningún mensaje')
+            os.replace(tmp_path, output_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        result['output'] = output_path
+    except Exception as e:
+        result['error'] = str(e)
+    finally:
+        # Confirma en la caché los mensajes de este archivo, aunque el proceso muera después
+        cache = get_default_cache()
+        if cache is not None:
+            cache.flush()
+    return result
+
+def _init_worker(backend, cache_path):
+    set_default_backend(backend)
+    if cache_path:
+        set_default_cache(MessageCache(cache_path))
+
+def _new_pool(jobs):
+    cache = get_default_cache()
+    return ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                               initargs=(get_default_backend(), cache.path if cache else None))
+
+def run_conversions(tasks, jobs=1, reader='tree', dedup='global'):
+    """Convierte pares (entrada, salida) y produce sus resultados en el mismo
+    orden en que llegan las tareas.
+
+    Con `jobs` > 1 se reparten entre un pool de procesos, con como mucho
+    2 * jobs conversiones en vuelo, de modo que `tasks` puede ser un generador
+    arbitrariamente largo. Un worker que muere (falta de memoria, segfault)
+    rompe el pool entero: se crea otro y los archivos que estaban en vuelo se
+    reintentan, así que solo se marca como fallido el que lo tumbó.
+    """
+    convert = functools.partial(convert_file, reader=reader, dedup=dedup)
+    if jobs <= 1:
+        for input_path, output_path in tasks:
+            yield convert(input_path, output_path)
+        return
+
+    pool = _new_pool(jobs)
+    pending = deque()
+    try:
+        for input_path, output_path in tasks:
+            try:
+                future = pool.submit(convert, input_path, output_path)
+            except BrokenProcessPool:
+                pool = _recover_pool(pool, pending, jobs, convert)
+                future = pool.submit(convert, input_path, output_path)
+            pending.append((input_path, output_path, future))
+            if len(pending) >= 2 * jobs:
+                pool = _wait_first(pool, pending, jobs, convert)
+                yield _collect_result(*pending.popleft())
+        while pending:
+            pool = _wait_first(pool, pending, jobs, convert)
+            yield _collect_result(*pending.popleft())
+    finally:
+        pool.shutdown()
+
+def _wait_first(pool, pending, jobs, convert):
+    """Espera a la primera conversión en vuelo; si el pool se ha roto, lo recupera."""
+    if isinstance(pending[0][2].exception(), BrokenProcessPool):
+        pool = _recover_pool(pool, pending, jobs, convert)
+    return pool
+
+def _recover_pool(pool, pending, jobs, convert):
+    """Sustituye un pool roto y reintenta las conversiones en vuelo que se perdieron.
+
+    No se sabe qué archivo tumbó al worker, así que los afectados se reintentan
+    de uno en uno: el que vuelve a romper el pool estando solo es el culpable y
+    se queda con el error; los demás recuperan su resultado.
+    """
+    pool.shutdown()
+    pool = _new_pool(jobs)
+    for i, (input_path, output_path, future) in enumerate(pending):
+        if not isinstance(future.exception(), BrokenProcessPool):
+            continue
+        retry = pool.submit(convert, input_path, output_path)
+        if isinstance(retry.exception(), BrokenProcessPool):
+            pool.shutdown()
+            pool = _new_pool(jobs)
+        pending[i] = (input_path, output_path, retry)
+    return pool
+
+def _collect_result(input_path, output_path, future):
+    try:
+        return future.result()
     except Exception as e:
+        return {'input': input_path, 'output': None, 'bytes': 0, 'error': str(e) or type(e).__name__}
+
+def iter_html_files(input_dir, recursive=False, include=('*.html',), exclude=()):
+    """Recorre `input_dir` con os.scandir y produce rutas relativas de HTML.
+
+    Es un generador: nunca guarda la lista completa de archivos, así que sirve
+    para archivos con cientos de miles de exports repartidos en subcarpetas.
+    Los patrones glob se comparan con el nombre y con la ruta relativa (con
+    '/'); un directorio excluido no se recorre. Cada carpeta se recorre en
+    orden alfabético para que el orden de salida sea determinista.
+    """
+    def matches(name, rel_path, patterns):
+        return any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(rel_path, p) for p in patterns)
+
+    stack = ['']
+    while stack:
+        rel_dir = stack.pop()
+        with os.scandir(os.path.join(input_dir, rel_dir)) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        subdirs = []
+        for entry in entries:
+            rel_path = os.path.join(rel_dir, entry.name)
+            posix_path = rel_path.replace(os.sep, '/')
+            if matches(entry.name, posix_path, exclude):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if recursive:
+                    subdirs.append(rel_path)
+            elif entry.is_file() and matches(entry.name, posix_path, include):
+                yield rel_path
+        stack.extend(reversed(subdirs))
+
+def process_conversations_folder(input_dir, reader='tree', jobs=1, force=False, output_dir=None,
+                                 recursive=False, include=('*.html',), exclude=(), dedup='global'):
+    # Las salidas replican la estructura de carpetas de la entrada dentro de
+    # `output_dir` (por defecto, junto a cada HTML)
+    output_dir = output_dir or input_dir
+    if not os.path.isdir(input_dir):
+        print(f"⚠️ Error procesando directorio: '{input_dir}' no es un directorio")
+        return
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+    # El manifiesto permite saltarse los archivos que no han cambiado desde la última ejecución
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = ConversionManifest.load(os.path.join(output_dir, MANIFEST_NAME), CONVERTER_VERSION,
+                                       {'parser': get_default_backend(), 'reader': reader, 'dedup': dedup},
+                                       input_root=input_dir)
+    counts = {'found': 0, 'skipped': 0}
+
+    def pending_tasks():
+        for rel_path in iter_html_files(input_dir, recursive, include, exclude):
+            counts['found'] += 1
+            input_path = os.path.join(input_dir, rel_path)
+            output_path = os.path.join(output_dir, f"{os.path.splitext(rel_path)[0]}.md")
+            if not force and manifest.is_up_to_date(input_path, output_path):
+                counts['skipped'] += 1
+                continue
+            yield input_path, output_path
+
+    start = time.perf_counter()
+    success_count = 0
+    total_bytes = 0
+    failures = 0
+    try:
+        for result in run_conversions(pending_tasks(), jobs=jobs, reader=reader, dedup=dedup):
+            total_bytes += result['bytes']
+            if result['error']:
+                failures += 1
+                print(f"❌ Error en {result['input']}: {result['error']}")
+            else:
+                manifest.record(result['input'], result['output'])
+                print(f"✅ Guardado en: {result['output']}")
+                success_count += 1
+    except OSError as e:
         print(f"⚠️ Error procesando directorio: {str(e)}")
+    finally:
+        manifest.save()
+    elapsed = max(time.perf_counter() - start, 1e-9)
+
+    if not counts['found']:
+        print("⚠️ No se encontraron archivos .html en el directorio de entrada")
+        print("   Coloca tus archivos SingleFile HTML en:", os.path.abspath(input_dir))
+        return
+
+    converted = counts['found'] - counts['skipped']
+    print(f"\n🎉 Proceso completado: {success_count}/{converted} archivos convertidos")
+    if counts['skipped']:
+        print(f"   {counts['skipped']} archivos sin cambios omitidos (usa --force para reconvertirlos)")
+    if failures:
+        print(f"   {failures} archivos con errores")
+    print(f"⏱️ {elapsed:.2f}s con {jobs} proceso(s): "
+          f"{converted / elapsed:.1f} archivos/s, {total_bytes / elapsed / 1e6:.2f} MB/s")
 
 def main():
     parser = argparse.ArgumentParser(description='Convert Gemini HTML conversations to Markdown')
     parser.add_argument('input_path', help='Path to HTML file or directory containing HTML files')
+    parser.add_argument('--parser', choices=['auto'] + KNOWN_BACKENDS, default='html.parser',
+                        help="HTML parser backend (default: html.parser; 'auto' picks the fastest installed one)")
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Convert files of a directory in N parallel processes (0 = one per CPU core)')
+    parser.add_argument('--output-dir', '-o',
+                        help='Write Markdown files here, mirroring the input folder layout (default: next to each HTML file)')
+    parser.add_argument('--recursive', '-r', action='store_true',
+                        help='Also convert HTML files in subdirectories')
+    parser.add_argument('--include', action='append',
+                        help="Glob of files to convert, matched against the name or relative path (repeatable; default: '*.html')")
+    parser.add_argument('--exclude', action='append', default=[],
+                        help='Glob of files or directories to skip (repeatable)')
+    parser.add_argument('--force', action='store_true',
+                        help='Reconvert every file, even those the manifest records as unchanged')
+    parser.add_argument('--reader', choices=READERS, default='tree',
+                        help="How to read each HTML file: 'tree' parses the whole document, 'stream' reads it incrementally "
+                             "and only builds the message subtrees (lower memory), 'scan' memory-maps it and only decodes and "
+                             "parses the byte spans around messages (fastest on asset-heavy SingleFile pages)")
+    parser.add_argument('--stream', action='store_const', dest='reader', const='stream',
+                        help='Shorthand for --reader stream')
+    parser.add_argument('--dedup', choices=DEDUP_SCOPES, default='global',
+                        help="Which earlier messages a repeated one is compared against: 'adjacent' (the previous one), "
+                             f"'window' (the last {DEDUP_WINDOW} kept) or 'global' (all of them; memory grows with the "
+                             "conversation)")
+    parser.add_argument('--cache', metavar='PATH',
+                        help='SQLite file caching converted messages, so re-exported conversations only convert their new turns')
     args = parser.parse_args()
-
-    if os.path.isfile(args.input_path):
-        # Es un archivo, procesarlo directamente
-        extract_conversation_targeted(args.input_path)
-    elif os.path.isdir(args.input_path):
-        # Es un directorio, procesar todos los archivos
-        process_conversations_folder(args.input_path)
-    else:
-        print(f"Error: Path '{args.input_path}' does not exist or is not a file/directory")
-        return 1
+    set_default_backend(args.parser)
+    if args.cache:
+        set_default_cache(MessageCache(args.cache))
+    try:
+        if os.path.isfile(args.input_path):
+            # Es un archivo: el motor de estrategias elige el extractor
+            result = extract_conversation_auto(args.input_path, dedup=args.dedup)
+            if not result['conversation']:
+                print(f"⚠️ No se pudo extraer ninguna conversación de {args.input_path}")
+                return 1
+            if not result['confident']:
+                print("⚠️ Resultado poco fiable: ninguna estrategia superó la comprobación")
+            stem = os.path.splitext(os.path.basename(args.input_path))[0]
+            output_path = os.path.join(args.output_dir or os.path.dirname(args.input_path), stem + '.md')
+            if args.output_dir:
+                os.makedirs(args.output_dir, exist_ok=True)
+            metadata = extract_conversation_metadata(args.input_path, result['title'])
+            with open(output_path, 'w', encoding='utf-8') as f:
+                write_gemini_markdown(result['conversation'], metadata, f)
+            print(f"✅ Guardado en: {output_path}")
+        elif os.path.isdir(args.input_path):
+            # Es un directorio, procesar todos los archivos
+            process_conversations_folder(args.input_path, reader=args.reader, jobs=args.jobs, force=args.force,
+                                         output_dir=args.output_dir, recursive=args.recursive,
+                                         include=args.include or ['*.html'], exclude=args.exclude, dedup=args.dedup)
+        else:
+            print(f"Error: Path '{args.input_path}' does not exist or is not a file/directory")
+            return 1
+        return 0
+    finally:
+        if args.cache:
+            get_default_cache().close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
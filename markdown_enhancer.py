@@ -1,268 +1,643 @@
+import hashlib
 import re
+from collections import namedtuple
+from types import GeneratorType
 from bs4 import BeautifulSoup, NavigableString, Tag
+from bs4.element import PreformattedString
+from code_blocks import class_language, guess_language, header_language, normalize_code
+from markdown_escape import text_escaper
+from parser_backends import make_soup
+
+# Bump whenever a change alters the Markdown produced for the same HTML, so
+# incremental folder runs know their earlier outputs are stale.
+CONVERTER_VERSION = 9
+
+NON_EMPTY_LINE = re.compile(r'^(?=.)', re.MULTILINE)
+
+# Where a node sits, handed down the traversal instead of looking at its
+# ancestors: the nesting level its block is indented to, whether it is inside
+# a <pre> (or other whitespace-preserving tag) or a table cell, how many list
+# items and quotes enclose it, and whether its text is code, link text or a
+# heading, which decides how it is escaped
+ConversionContext = namedtuple('ConversionContext', ['nesting_level', 'in_pre', 'in_cell', 'list_depth', 'quote_depth',
+                                                     'in_code', 'in_link', 'in_heading'],
+                               defaults=[0, False, False, 0, 0, False, False, False])
+ROOT_CONTEXT = ConversionContext()
+
+# Children of list items and quotes rendered as blocks of their own rather than inline text
+LIST_BLOCK_TAGS = frozenset(['ul', 'ol', 'pre', 'blockquote', 'p', 'table', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+# Blocks that start on the line after the item's marker
+LIST_OWN_LINE_TAGS = frozenset(['ul', 'ol', 'pre', 'table'])
+HEADING_TAGS = frozenset(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])
+
+# Row groups of a table; rows directly under <table> are read as well
+TABLE_SECTION_TAGS = frozenset(['thead', 'tbody', 'tfoot'])
+TABLE_CELL_TAGS = frozenset(['th', 'td'])
+TABLE_ALIGNMENT_RULES = {None: '---', 'left': ':---', 'center': ':---:', 'right': '---:'}
+TEXT_ALIGN_STYLE = re.compile(r'text-align\s*:\s*(left|center|right)', re.IGNORECASE)
+# Upper bound of colspan in the HTML standard
+MAX_COLSPAN = 1000
+
+
+def _parse_int(value, default):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def _list_start(element):
+    return _parse_int(element.get('start'), 1)
+
+
+def _table_rows(element):
+    # The rows of a table, section or single row in document order, whether
+    # or not the parser added the <thead>/<tbody> wrappers
+    if element.name == 'tr':
+        yield element
+        return
+    for child in element.children:
+        if not isinstance(child, Tag):
+            continue
+        if child.name == 'tr':
+            yield child
+        elif child.name in TABLE_SECTION_TAGS:
+            for row in child.children:
+                if isinstance(row, Tag) and row.name == 'tr':
+                    yield row
+
+
+def _cell_span(cell):
+    return min(max(_parse_int(cell.get('colspan'), 1), 1), MAX_COLSPAN)
+
+
+def _cell_alignment(cell):
+    align = cell.get('align', '').lower()
+    if align in ('left', 'center', 'right'):
+        return align
+    match = TEXT_ALIGN_STYLE.search(cell.get('style', ''))
+    return match.group(1).lower() if match else None
+
+
+def collapse_whitespace(text):
+    """Collapses every whitespace run of a non-blank text node into one space.
+
+    Same result as replacing each whitespace run with re.sub, with str.split
+    (which has the same definition of whitespace) doing the scan in C,
+    several times faster.
+    """
+    collapsed = ' '.join(text.split())
+    if text[:1].isspace(): collapsed = ' ' + collapsed
+    if text[-1:].isspace(): collapsed += ' '
+    return collapsed
+
+
+def _indent_lines(text, prefix):
+    # Blank lines stay empty so that paragraphs inside items keep a clean separator
+    return NON_EMPTY_LINE.sub(prefix, text) if prefix else text
 
 class EnhancedMarkdownConverter:
-    def __init__(self):
+    def __init__(self, parser_backend=None, cache=None, guess_code_language=False):
+        # None follows parser_backends' default (html.parser unless configured)
+        self.parser_backend = parser_backend
+        # Optional message_cache.MessageCache consulted by convert_element
+        self.cache = cache
+        # Label code blocks that declare no language with code_blocks.guess_language
+        self.guess_code_language = guess_code_language
         self.allowed_attrs = {
             'a': ['href'],
             'img': ['src', 'alt'],
-            'code': ['class']
+            'code': ['class'],
+            'pre': ['class', 'data-language'],
+            'ol': ['start'],
+            'li': ['value'],
+            'input': ['type', 'checked'],
+            'th': ['colspan', 'align', 'style'],
+            'td': ['colspan', 'align', 'style']
         }
         self.tags_to_remove = ['script', 'style', 'meta', 'link', 'head']
         self.tags_to_unwrap = ['span', 'div']
+        # Class of the header Gemini draws above a code block, holding its language name
+        self.code_header_class = 'code-block-decoration'
         self.indent_char = "    "
-
-    def _clean_attributes(self, soup):
-        for tag in soup.find_all(True):
-            allowed_tag_attrs = self.allowed_attrs.get(tag.name, [])
-            current_attrs = list(tag.attrs.keys())
-            for attr_name in current_attrs:
-                if attr_name not in allowed_tag_attrs:
-                    del tag[attr_name]
-        return soup
-
-    def _remove_tags(self, soup):
-        for tag_name in self.tags_to_remove:
-            for tag in soup.find_all(tag_name):
-                tag.decompose()
-        return soup
-
-    def _unwrap_tags(self, soup):
-        for _ in range(5):
-            unwrapped_in_pass = 0
-            for tag_name in self.tags_to_unwrap:
-                for tag in soup.find_all(tag_name): # Re-find in each pass
-                    tag.unwrap()
-                    unwrapped_in_pass +=1
-            if unwrapped_in_pass == 0:
-                break
-        return soup
+        self.whitespace_preserving_tags = ['pre', 'textarea']
+        # Tags whose children get a context of their own besides nest_children ones
+        self._context_tags = (frozenset(self.whitespace_preserving_tags) | TABLE_CELL_TAGS | HEADING_TAGS
+                              | {'li', 'blockquote', 'code', 'a'})
+        # (tag name, context, nesting level) -> context of the tag's children
+        self._child_contexts = {}
+        # context -> markdown_escape escaper for its text
+        self._escapers = {}
+        # Tag name -> (handler, convert_children, nest_children); see register_handler
+        self.handlers = {}
+        # Fingerprint of self.handlers for cache keys, computed when first needed
+        self._handlers_fingerprint = None
+        self._default_handler = (self._convert_default, True, False)
+        self._register_default_handlers()
 
     def _preprocess_html(self, html: str) -> BeautifulSoup:
-        soup = BeautifulSoup(html, 'html.parser')
-        soup = self._remove_tags(soup)
-        soup = self._unwrap_tags(soup)
-        soup = self._clean_attributes(soup)
+        soup = make_soup(html, self.parser_backend)
+        cleaned = BeautifulSoup('', 'html.parser')
+        self._copy_children(soup, cleaned, literal=False, pretty=False)
+        return cleaned
+
+    def _copy_string(self, cls, text: str, target: Tag, digest):
+        target.append(cls(text))
+        if digest is not None:
+            data = text.encode('utf-8', 'surrogatepass')
+            digest.update(b'\x05%s\x00%d\x00%s' % (cls.__name__.encode(), len(data), data))
+
+    def _copy_run(self, run: list, target: Tag, digest):
+        self._copy_string(NavigableString, ' ' + ' '.join(run) + ' ' if run else ' ', target, digest)
+        run.clear()
+
+    def _append_tag(self, source: Tag, target: Tag, digest, extra_attrs=None) -> Tag:
+        allowed_tag_attrs = self.allowed_attrs.get(source.name, [])
+        attrs = {name: value for name, value in source.attrs.items() if name in allowed_tag_attrs}
+        if extra_attrs: attrs.update(extra_attrs)
+        tag = Tag(name=source.name, attrs=attrs)
+        target.append(tag)
+        if digest is not None:
+            digest.update(b'\x02%s\x00%s\x03' % (source.name.encode(), repr(sorted(attrs.items())).encode()))
+        return tag
+
+    def _copy_children(self, source: Tag, target: Tag, literal: bool, pretty: bool, digest=None):
+        # Builds the preprocessed copy of `source`'s children under `target` in
+        # a single iterative walk: tags_to_remove are skipped, tags_to_unwrap
+        # are replaced by their children and attributes outside allowed_attrs
+        # are dropped, so the source tree is never mutated and nesting depth is
+        # not limited by the recursion limit.
+        # With `pretty`, text outside <pre>/<textarea> is laid out the way a
+        # prettify() + re-parse round trip leaves it: every child sits between
+        # whitespace-delimited text runs, and whitespace-only strings vanish.
+        # When a `digest` is given, every node of the copy is fed to it with
+        # explicit delimiters, which makes it a fingerprint of exactly what
+        # _convert_node will see.
+        # Gemini's code-block header is not copied: the language it names is
+        # set as data-language on the next <pre>.
+        # Each frame: (children left to copy, copy target, literal, pending text run, closes a copied tag)
+        stack = [(iter(source.children), target, literal, [], False)]
+        code_header = None
+        while stack:
+            children, target, literal, run, closes_tag = stack[-1]
+            collapse = pretty and not literal
+            for child in children:
+                if isinstance(child, Tag):
+                    if collapse: self._copy_run(run, target, digest)
+                    if child.name in self.tags_to_remove: continue
+                    child_literal = literal or child.name in self.whitespace_preserving_tags
+                    if child.name in self.tags_to_unwrap:
+                        if self.code_header_class in child.get('class', ()):
+                            code_header = next(child.stripped_strings, '')
+                            continue
+                        stack.append((iter(child.children), target, child_literal, [], False))
+                    else:
+                        extra_attrs = None
+                        if child.name == 'pre' and code_header is not None:
+                            extra_attrs = {'data-language': code_header}
+                            code_header = None
+                        tag = self._append_tag(child, target, digest, extra_attrs)
+                        stack.append((iter(child.children), tag, child_literal, [], True))
+                    break
+                if collapse and not isinstance(child, PreformattedString):
+                    piece = str(child).strip()
+                    if piece: run.append(piece)
+                    continue
+                if collapse: self._copy_run(run, target, digest)
+                self._copy_string(type(child), str(child), target, digest)
+            else:
+                stack.pop()
+                if collapse: self._copy_run(run, target, digest)
+                if closes_tag and digest is not None: digest.update(b'\x04')
+
+    def _copy_tag(self, source: Tag, target: Tag, literal: bool, pretty: bool, digest=None):
+        if source.name in self.tags_to_remove: return
+        literal = literal or source.name in self.whitespace_preserving_tags
+        if source.name in self.tags_to_unwrap:
+            self._copy_children(source, target, literal, pretty, digest)
+            return
+        tag = self._append_tag(source, target, digest)
+        self._copy_children(source, tag, literal, pretty, digest)
+        if digest is not None: digest.update(b'\x04')
+
+    def _preprocess_element(self, element: Tag, pretty: bool = True, digest=None) -> BeautifulSoup:
+        soup = BeautifulSoup('', 'html.parser')
+        self._copy_tag(element, soup, literal=False, pretty=pretty, digest=digest)
+        if pretty: soup.append(NavigableString(' '))
         return soup
 
+    def convert_element(self, element: Tag, pretty: bool = True) -> str:
+        """Converts an already parsed subtree without serializing it.
+
+        Preprocessing happens on a copy, so `element` and its document are left
+        untouched. With `pretty` (the default) the output is identical to
+        ``convert(element.prettify())``; without it, to ``convert(str(element))``.
+        If the converter has a `cache`, the copy is fingerprinted as it is built,
+        together with the converter's configuration, and a hit skips the
+        conversion itself. Converters with handlers other than the class's own
+        methods do not use the cache.
+        """
+        seed = None if self.cache is None else self._cache_seed(pretty)
+        if seed is None:
+            return self._convert_node(self._preprocess_element(element, pretty))
+        digest = hashlib.sha256(seed)
+        soup = self._preprocess_element(element, pretty, digest)
+        key = digest.hexdigest()
+        markdown = self.cache.get(key)
+        if markdown is None:
+            markdown = self._convert_node(soup)
+            self.cache.put(key, markdown)
+        return markdown
+
+    def _cache_seed(self, pretty):
+        # Start of every cache key: the options and configuration that change
+        # the Markdown produced for the same subtree. None when a handler is not
+        # one of the class's own methods, whose behaviour the key cannot capture.
+        if self._handlers_fingerprint is None:
+            entries = []
+            for name, (handler, convert_children, nest_children) in sorted(self.handlers.items()):
+                func = getattr(handler, '__func__', None)
+                if func is None or getattr(type(self), func.__name__, None) is not func:
+                    return None
+                entries.append((name, func.__name__, convert_children, nest_children))
+            self._handlers_fingerprint = repr(entries)
+        config = (type(self).__module__, type(self).__qualname__, pretty, self.guess_code_language,
+                  self._handlers_fingerprint, sorted(self.allowed_attrs.items()), self.tags_to_remove,
+                  self.tags_to_unwrap, self.code_header_class, self.indent_char, self.whitespace_preserving_tags)
+        return repr(config).encode()
+
     def convert(self, html: str) -> str:
+        if isinstance(html, Tag): return self.convert_element(html)
         soup = self._preprocess_html(html)
         if soup.name in ['html', 'body'] and hasattr(soup, 'contents'):
-             return self._convert_node(soup.contents, nesting_level=0)
-        return self._convert_node(soup, nesting_level=0)
-
-    def _convert_node(self, element, nesting_level=0):
+             return self._convert_node(soup.contents)
+        return self._convert_node(soup)
+
+    def register_handler(self, tag_name: str, handler, convert_children: bool = True, nest_children: bool = False):
+        """Registers ``handler(element, content, context) -> str`` for a tag.
+
+        `content` is the Markdown of the element's children, converted one
+        nesting level deeper when `nest_children` is set, or None when
+        `convert_children` is False and the handler walks them itself.
+        `context` is the element's ConversionContext; its `nesting_level` is
+        the indentation of the element's block. The returned string replaces
+        the element. Registering a built-in name overrides it, e.g.
+        ``converter.register_handler('math', render_math)``.
+        """
+        self.handlers[tag_name] = (handler, convert_children, nest_children)
+        self._child_contexts.clear()
+        self._handlers_fingerprint = None
+
+    def _register_default_handlers(self):
+        for name in ['p']: self.register_handler(name, self._convert_p)
+        for name in ['strong', 'b']: self.register_handler(name, self._convert_strong)
+        for name in ['em', 'i']: self.register_handler(name, self._convert_em)
+        for name in ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']: self.register_handler(name, self._convert_heading)
+        self.register_handler('blockquote', self._convert_blockquote, convert_children=False)
+        self.register_handler('li', self._convert_passthrough, nest_children=True)
+        self.register_handler('ul', self._convert_ul, convert_children=False)
+        self.register_handler('ol', self._convert_ol, convert_children=False)
+        self.register_handler('a', self._convert_a)
+        for name in ['table', 'thead', 'tbody', 'tfoot', 'tr']: self.register_handler(name, self._convert_table, convert_children=False)
+        for name in ['th', 'td']: self.register_handler(name, self._convert_passthrough, nest_children=True)
+        self.register_handler('pre', self._convert_pre, convert_children=False)
+        self.register_handler('code', self._convert_code)
+        self.register_handler('br', self._convert_br)
+        self.register_handler('img', self._convert_img)
+        for name in ['html', 'body', 'title']: self.register_handler(name, self._convert_passthrough)
+
+    def _convert_node(self, element, context=ROOT_CONTEXT):
+        # Evaluates the tree with an explicit stack of generators instead of
+        # recursion, so nesting depth is not limited by the recursion limit.
+        # A task yields (child, context) pairs and is sent back each child's
+        # Markdown; its return value is the Markdown of its own node.
+        value = self._start_task(element, context)
+        if not isinstance(value, GeneratorType):
+            return value
+        stack = [value]
+        value = None
+        while stack:
+            try:
+                child, child_context = stack[-1].send(value)
+            except StopIteration as finished:
+                stack.pop()
+                value = finished.value
+                continue
+            value = self._start_task(child, child_context)
+            if isinstance(value, GeneratorType):
+                stack.append(value)
+                value = None
+        return value
+
+    def _start_task(self, element, context):
+        # Returns the node's Markdown directly when no children need converting,
+        # otherwise a generator task for _convert_node to drive.
         # 1. Handle Text Nodes
         if isinstance(element, NavigableString):
-            text = str(element)
-            if element.parent and element.parent.name == 'pre':
-                return text
-            if text.isspace():
-                return ' '
-            return re.sub(r'\s+', ' ', text)
+            return self._convert_text(element, context, line_start=True)
 
         # 2. Handle Lists of Nodes
-        if isinstance(element, list) or isinstance(element, type(BeautifulSoup().contents)):
-             return ''.join([self._convert_node(child, nesting_level) for child in element])
+        if isinstance(element, list):
+            return self._convert_sequence(element, context)
 
         # 3. Handle Non-Tag Elements
         if not isinstance(element, Tag):
             return ''
 
-        # 4. Determine Nesting Level for Children
-        child_content_nesting_level = nesting_level
-        if element.name in ['blockquote', 'li', 'td', 'th']:
-            child_content_nesting_level = nesting_level + 1
-
-        # 5. Process Children
-        processed_children_content = ""
-        if element.name not in ['pre', 'ul', 'ol', 'table', 'thead', 'tbody', 'tr']:
-            processed_children_content = ''.join([self._convert_node(child, child_content_nesting_level) for child in element.contents])
-
-        # 6. Tag-Specific Conversion Logic
-        current_element_indent_prefix = self.indent_char * nesting_level
-
-        if element.name == 'p':
-            stripped_content = processed_children_content.strip()
-            if not stripped_content: return "\n\n"
-            parent = element.parent
-            if parent and parent.name in ['li', 'blockquote', 'td', 'th']:
-                 return stripped_content + '\n\n'
+        # 4. Dispatch on the tag name, converting the children first unless the handler walks them itself
+        handler, convert_children, nest_children = self.handlers.get(element.name, self._default_handler)
+        if convert_children:
+            child_context = self._enter(element, context) if nest_children or element.name in self._context_tags else context
+            return self._convert_children_then(element, handler, context, child_context)
+        return handler(element, None, context)
+
+    def _enter(self, element, context, nesting_level=None):
+        # Context of `element`'s children: one level deeper for nest_children
+        # tags unless `nesting_level` is given, plus the flags the tag sets.
+        # Contexts are immutable, so each distinct one is built only once.
+        key = (element.name, context, nesting_level)
+        child_context = self._child_contexts.get(key)
+        if child_context is None:
+            name = element.name
+            if nesting_level is None:
+                nest_children = self.handlers.get(name, self._default_handler)[2]
+                nesting_level = context.nesting_level + 1 if nest_children else context.nesting_level
+            child_context = self._child_contexts[key] = ConversionContext(
+                nesting_level,
+                context.in_pre or name in self.whitespace_preserving_tags,
+                context.in_cell or name in TABLE_CELL_TAGS,
+                context.list_depth + (name == 'li'),
+                context.quote_depth + (name == 'blockquote'),
+                context.in_code or name == 'code',
+                context.in_link or name == 'a',
+                context.in_heading or name in HEADING_TAGS)
+        return child_context
+
+    def _convert_text(self, element, context, line_start=False):
+        # `line_start`: the text begins a line, where block markers need escaping
+        text = str(element)
+        if context.in_pre:
+            return text
+        if text.isspace():
+            return ' '
+        escape = self._escapers.get(context)
+        if escape is None:
+            escape = self._escapers[context] = text_escaper(context.in_cell, context.in_link,
+                                                           context.in_heading, context.in_code)
+        return escape(collapse_whitespace(text), line_start)
+
+    def _convert_sequence(self, elements, context):
+        parts = []
+        line_start = True
+        for child in elements:
+            # Text is converted inline; only tags become tasks of their own
+            if isinstance(child, NavigableString): part = self._convert_text(child, context, line_start)
+            else: part = yield child, context
+            if part.startswith('[') and parts and parts[-1].endswith('!'):
+                parts[-1] = self._escape_image_marker(parts[-1], context)
+            parts.append(part)
+            # Blocks and <br> end with a newline; whitespace alone leaves the line as it was
+            if part.endswith('\n'): line_start = True
+            elif part and not part.isspace(): line_start = False
+        return ''.join(parts)
+
+    def _escape_image_marker(self, part, context):
+        # `part` ends with '!' and the next one opens a link: '![' would make an
+        # image of it. Code keeps the '!' as is, as it keeps every character
+        if context.in_code or context.in_pre:
+            return part
+        return part[:-1] + '\\!'
+
+    def _convert_children_then(self, element, handler, context, child_context):
+        content = yield from self._convert_sequence(element.contents, child_context)
+        result = handler(element, content, context)
+        if isinstance(result, GeneratorType):
+            result = yield from result
+        return result
+
+    def _indent_block(self, text: str, prefix: str) -> str:
+        # Prefixes every line of `text` in one pass instead of split/prefix/join
+        return prefix + text.replace('\n', '\n' + prefix) if prefix else text
+
+    def _convert_default(self, element, content, context):
+        return content.strip()
+
+    def _convert_passthrough(self, element, content, context):
+        return content
+
+    def _convert_p(self, element, content, context):
+        stripped_content = content.strip()
+        if not stripped_content: return "\n\n"
+        # List items, quotes and cells indent their whole content themselves
+        if context.list_depth or context.quote_depth or context.in_cell:
+             return stripped_content + '\n\n'
+        return self._indent_block(stripped_content, self.indent_char * context.nesting_level) + '\n\n'
+
+    def _convert_strong(self, element, content, context):
+        return f'**{content.strip()}**'
+
+    def _convert_em(self, element, content, context):
+        return f'*{content.strip()}*' # Corrected: single asterisk for italic
+
+    def _convert_heading(self, element, content, context):
+        level = int(element.name[1])
+        return '#' * level + ' ' + content.strip() + '\n\n'
+
+    def _convert_blockquote(self, element, content, context):
+        # Like a list item, the quote is built from block segments converted
+        # at level 0 and prefixed as a whole, so a list or code block inside it
+        # is not indented; blank lines between paragraphs stay quoted
+        segments = yield from self._block_segments(element, self._enter(element, context, 0))
+        if not segments: return "\n\n"
+        lines = []
+        previous = None
+        for kind, block in segments:
+            if lines and (kind == 'p' or previous == 'p'):
+                lines.append('')
+            lines.append(block)
+            previous = kind
+        marker = self.indent_char * context.nesting_level + '>'
+        return '\n'.join(marker + ' ' + line if line else marker for line in '\n'.join(lines).split('\n')) + "\n\n"
+
+    def _block_segments(self, element, context):
+        # One pass over the children of a list item or quote: runs of inline
+        # nodes are joined into text segments, block children become segments
+        # of their own. `context` is the children's, at level 0: the caller
+        # indents or prefixes the whole body.
+        segments = []
+        inline = []
+        line_start = True
+        for child in element.contents:
+            if isinstance(child, Tag) and child.name in LIST_BLOCK_TAGS:
+                text = ''.join(inline).strip()
+                if text: segments.append((None, text))
+                inline = []
+                line_start = True
+                block = (yield child, context).strip('\n')
+                if block.strip(): segments.append((child.name, block))
+                continue
+            if isinstance(child, NavigableString):
+                part = self._convert_text(child, context, line_start)
+            else:
+                part = yield child, context
+            if part.startswith('[') and inline and inline[-1].endswith('!'):
+                inline[-1] = self._escape_image_marker(inline[-1], context)
+            inline.append(part)
+            if part.endswith('\n'): line_start = True
+            elif part and not part.isspace(): line_start = False
+        text = ''.join(inline).strip()
+        if text: segments.append((None, text))
+        return segments
+
+    def _task_marker(self, li_element):
+        # GitHub-style task item: a checkbox before any other content
+        first = li_element.find(True, recursive=False)
+        if first is not None and first.name == 'p':
+            first = first.find(True, recursive=False)
+        if first is None or first.name != 'input' or first.get('type', '').lower() != 'checkbox':
+            return ''
+        for sibling in first.previous_siblings:
+            if not isinstance(sibling, NavigableString) or sibling.strip():
+                return ''
+        # The <input> itself converts to nothing
+        return '[x] ' if first.has_attr('checked') else '[ ] '
+
+    def _convert_list(self, element, context, ordered):
+        # Shared by <ul> and <ol>. Each item's body is built from its segments
+        # and indented as a whole: nested lists, code blocks and quotes sit one
+        # indent deeper than the marker, whatever their own depth. Markers from
+        # "100. " on are wider than the indent, and the body must clear them.
+        prefix = self.indent_char * context.nesting_level
+        number = _list_start(element) if ordered else None
+        md_items = []
+        for li_element in element.find_all('li', recursive=False):
+            if ordered and li_element.has_attr('value'):
+                number = _parse_int(li_element['value'], number)
+            task = self._task_marker(li_element)
+            segments = yield from self._block_segments(li_element, self._enter(li_element, context, 0))
+            marker = f"{number}. " if ordered else '* '
+            body_indent = prefix + ' ' * max(len(self.indent_char), len(marker))
+            if ordered:
+                number += 1
+            if not segments:
+                if task: md_items.append(prefix + marker + task.rstrip())
+                continue
+            kind, first = segments[0]
+            if kind in LIST_OWN_LINE_TAGS and not task:
+                # A list or code block cannot share the marker's line
+                lines = [prefix + marker.rstrip()]
+                rest = segments
             else:
-                 lines = stripped_content.split('\n')
-                 actual_indent = current_element_indent_prefix if nesting_level > 0 else ""
-                 indented_lines = [actual_indent + line for line in lines]
-                 return "\n".join(indented_lines) + '\n\n'
-
-        elif element.name in ['strong', 'b']:
-            return f'**{processed_children_content.strip()}**'
-        elif element.name in ['em', 'i']:
-            return f'*{processed_children_content.strip()}*' # Corrected: single asterisk for italic
-
-        elif element.name.startswith('h') and len(element.name) == 2 and element.name[1].isdigit():
-            level = int(element.name[1])
-            return '#' * level + ' ' + processed_children_content.strip() + '\n\n'
-
-        elif element.name == 'blockquote':
-            stripped_content = processed_children_content.strip()
-            if not stripped_content: return "\n\n"
-            lines = stripped_content.split('\n')
-            quote_marker_line_prefix = current_element_indent_prefix + '> '
-            quoted_lines = [quote_marker_line_prefix + line for line in lines]
-            return "\n".join(quoted_lines) + "\n\n"
-
-        elif element.name == 'li':
-            return processed_children_content
-
-        elif element.name == 'ul':
-            md_items = []
-            for li_element in element.find_all('li', recursive=False):
-                li_content_markdown = self._convert_node(li_element, nesting_level)
-                item_lines = li_content_markdown.strip().split('\n')
-                is_empty_li_content = not item_lines or (not item_lines[0].strip() and len(item_lines) == 1)
-                has_sublist = li_element.find(['ul', 'ol'], recursive=False)
-                if is_empty_li_content and not has_sublist:
-                    is_truly_empty_text_nodes = not any(c.strip() for c in li_element.contents if isinstance(c, NavigableString))
-                    is_truly_empty_tags = not li_element.find(True, recursive=False)
-                    if is_truly_empty_text_nodes and is_truly_empty_tags:
-                        md_items.append( current_element_indent_prefix + '* ' )
-                        continue
-                first_line_content = item_lines[0] if item_lines and item_lines[0] else ""
-                first_child_tag = li_element.find(True, recursive=False)
-                bullet_on_own_line = False
-                if first_child_tag and first_child_tag.name in ['ul', 'ol', 'pre', 'blockquote']:
-                    no_text_before = True; prev_sibling = first_child_tag.previous_sibling
-                    while prev_sibling:
-                        if (isinstance(prev_sibling, NavigableString) and prev_sibling.strip()) or isinstance(prev_sibling, Tag):
-                            no_text_before = False; break
-                        prev_sibling = prev_sibling.previous_sibling
-                    if no_text_before: bullet_on_own_line = True
-                if bullet_on_own_line:
-                     md_items.append(current_element_indent_prefix + '*')
-                     md_items.append(first_line_content)
-                else:
-                     md_items.append(current_element_indent_prefix + '* ' + first_line_content)
-                subsequent_line_text_indent = current_element_indent_prefix + self.indent_char
-                for k in range(1, len(item_lines)): md_items.append(subsequent_line_text_indent + item_lines[k])
-            return "\n".join(md_items) + "\n\n" if md_items else "\n\n"
-
-        elif element.name == 'ol':
-            md_items = []
-            for i, li_element in enumerate(element.find_all('li', recursive=False)):
-                li_content_markdown = self._convert_node(li_element, nesting_level)
-                item_lines = li_content_markdown.strip().split('\n')
-                is_empty_li_content = not item_lines or (not item_lines[0].strip() and len(item_lines) == 1)
-                has_sublist = li_element.find(['ul', 'ol'], recursive=False)
-                if is_empty_li_content and not has_sublist:
-                    is_truly_empty_text_nodes = not any(c.strip() for c in li_element.contents if isinstance(c, NavigableString))
-                    is_truly_empty_tags = not li_element.find(True, recursive=False)
-                    if is_truly_empty_text_nodes and is_truly_empty_tags:
-                        md_items.append( current_element_indent_prefix + f"{i+1}. ")
-                        continue
-                marker = f"{i + 1}. "; first_line_content = item_lines[0] if item_lines and item_lines[0] else ""
-                first_child_tag = li_element.find(True, recursive=False)
-                bullet_on_own_line = False
-                if first_child_tag and first_child_tag.name in ['ul', 'ol', 'pre', 'blockquote']:
-                    no_text_before = True; prev_sibling = first_child_tag.previous_sibling
-                    while prev_sibling:
-                        if (isinstance(prev_sibling, NavigableString) and prev_sibling.strip()) or isinstance(prev_sibling, Tag):
-                            no_text_before = False; break
-                        prev_sibling = prev_sibling.previous_sibling
-                    if no_text_before: bullet_on_own_line = True
-                if bullet_on_own_line:
-                    md_items.append(current_element_indent_prefix + marker.strip())
-                    md_items.append(first_line_content)
-                else:
-                    md_items.append(current_element_indent_prefix + marker + first_line_content)
-                subsequent_line_text_indent = current_element_indent_prefix + ' ' * len(marker)
-                for k in range(1, len(item_lines)): md_items.append(subsequent_line_text_indent + item_lines[k])
-            return "\n".join(md_items) + "\n\n" if md_items else "\n\n"
-
-        elif element.name == 'a':
-            href = element.get('href', '')
-            return f'[{processed_children_content.strip()}]({href})'
-
-        elif element.name == 'table':
-            header_md = ""; tbody_md = ""
-            thead = element.find('thead')
-            if thead: header_md = self._convert_node(thead, nesting_level)
-            tbody = element.find('tbody')
-            if tbody: tbody_md = self._convert_node(tbody, nesting_level)
-            if not header_md.strip() and not tbody_md.strip(): return "\n\n"
-            return (header_md + tbody_md).strip('\n') + "\n\n"
-
-        elif element.name == 'thead':
-            rows = [self._convert_node(tr, nesting_level) for tr in element.find_all('tr', recursive=False)]
-            if not any(row.strip() for row in rows): return ""
-            num_cols = 0; tr_elements = element.find_all('tr', recursive=False)
-            if tr_elements: num_cols = len(tr_elements[0].find_all(['th', 'td'], recursive=False))
-            if num_cols == 0 and element.parent and element.parent.name == 'table':
-                tbody = element.parent.find('tbody')
-                if tbody and tbody.find('tr'): num_cols = len(tbody.find('tr').find_all('td', recursive=False))
-            separator = "| " + " | ".join(["---"] * num_cols) + " |\n" if num_cols > 0 else "|\n"
-            return "".join(rows) + separator
-
-        elif element.name == 'tbody':
-            return "".join([self._convert_node(tr, nesting_level) for tr in element.find_all('tr', recursive=False)])
-
-        elif element.name == 'tr':
+                first_line, _, more = first.partition('\n')
+                lines = [prefix + marker + task + first_line]
+                if more:
+                    lines.append(_indent_lines(more, body_indent))
+                rest = segments[1:]
+            previous = kind
+            for kind, block in rest:
+                # Paragraphs are separated by a blank line, everything else follows directly
+                if rest is not segments and (kind == 'p' or previous == 'p'):
+                    lines.append('')
+                lines.append(_indent_lines(block, body_indent))
+                previous = kind
+            md_items.append('\n'.join(lines))
+        return "\n".join(md_items) + "\n\n" if md_items else "\n\n"
+
+    def _convert_ul(self, element, content, context):
+        return self._convert_list(element, context, ordered=False)
+
+    def _convert_ol(self, element, content, context):
+        return self._convert_list(element, context, ordered=True)
+
+    def _attribute_text(self, value, context):
+        # Attribute values skip the text-node escaping; only a pipe can break a cell
+        return value.replace('|', '\\|') if context.in_cell else value
+
+    def _convert_a(self, element, content, context):
+        href = self._attribute_text(element.get('href', ''), context)
+        return f'[{content.strip()}]({href})'
+
+    def _table_cell_text(self, content):
+        # A cell must stay on one line: newlines become <br>. Pipes in its text
+        # were escaped with it; a code block's are escaped here, except in the
+        # fence lines
+        text = content.strip()
+        if text.startswith('```') and text.endswith('```') and '\n' in text:
+            fence, _, rest = text.partition('\n')
+            code, _, closing = rest.rpartition('\n')
+            text = fence + '\n' + code.replace('|', '\\|') + '\n' + closing
+        return text.replace('\n', '<br>')
+
+    def _convert_table(self, element, content, context):
+        # Table engine, also used for a <thead>, <tbody>, <tfoot> or <tr> met
+        # outside a table. Rows are walked once, in document order, and each
+        # body row is rendered as soon as its cells are converted; only the
+        # header and its separator wait for the end, when the column count (the
+        # widest row, spans included) and the column alignments are known.
+        # Markdown tables need a header, so the first row always provides it.
+        header = None
+        body = []
+        alignments = []
+        width = 0
+        for row in _table_rows(element):
             cells = []
-            for cell_el in element.find_all(['th', 'td'], recursive=False):
-                content = self._convert_node(cell_el, nesting_level)
-                is_code = content.strip().startswith('```') and content.strip().endswith('```')
-                if is_code:
-                    lines = content.strip().split('\n')
-                    if len(lines) >= 2:
-                        code_lines = lines[1:-1]
-                        escaped_code = [l.replace('|', '\\|') for l in code_lines]
-                        text = lines[0] + '\n' + '\n'.join(escaped_code) + '\n' + lines[-1]
-                        text = text.replace('\n', '<br>')
-                    else: text = content.strip().replace('|', '\\|').replace('\n', '<br>')
-                else: text = content.strip().replace('|', '\\|').replace('\n', '<br>')
-                cells.append(text if text.strip() else " ")
-            return "| " + " | ".join(cells) + " |\n" if cells else ""
-
-        elif element.name in ['th', 'td']:
-            return processed_children_content
-
-        elif element.name == 'pre':
-            raw_text = ""; lang = ""
-            code_tag = element.find('code')
-            indent_str = current_element_indent_prefix
-            if code_tag:
-                for cls in code_tag.get('class', []):
-                    if cls.startswith('language-'): lang = cls[len('language-'):]; break
-                raw_text = code_tag.get_text(strip=False)
+            for cell in row.children:
+                if not isinstance(cell, Tag) or cell.name not in TABLE_CELL_TAGS:
+                    continue
+                alignment = _cell_alignment(cell)
+                if alignment:
+                    alignments.extend([None] * (len(cells) + 1 - len(alignments)))
+                    alignments[len(cells)] = alignments[len(cells)] or alignment
+                # Markdown has no spans: the cell is followed by empty ones
+                cells.append(self._table_cell_text((yield cell.contents, self._enter(cell, context, 0))))
+                cells.extend([''] * (_cell_span(cell) - 1))
+            if not cells:
+                continue
+            if header is None:
+                header = cells
             else:
-                raw_text = element.get_text(strip=False)
-            lines = [l.rstrip() for l in raw_text.splitlines()]
-            min_indent = float('inf')
-            for l in lines:
-                if l.strip(): min_indent = min(min_indent, len(l) - len(l.lstrip()))
-            if min_indent == float('inf'): min_indent = 0
-            dedented = [l[min_indent:] for l in lines] if min_indent > 0 else lines
-            start = 0;
-            while start < len(dedented) and not dedented[start].strip(): start += 1
-            end = len(dedented)
-            while end > start and not dedented[end-1].strip(): end -=1
-            final_lines = dedented[start:end]
-            content = "\n".join(final_lines)
-            return f"{indent_str}```{lang}\n" + \
-                   "\n".join([indent_str + l for l in final_lines]) + \
-                   f"\n{indent_str}```\n\n"
-
-        elif element.name == 'code':
-            if element.find_parent('pre'): return processed_children_content
-            text = processed_children_content.strip()
-            if '`' not in text: return f'`{text}`'
-            ticks = '``'; padding = " " if text.startswith('`') or text.endswith('`') or ' ' not in text else ""
-            while f'{ticks}{padding}{text}{padding}{ticks}'.count('`') % 2 != 0 or ticks in text : ticks += '`' ; padding = " "
-            return f"{ticks}{padding}{text}{padding}{ticks}"
-
-        elif element.name == 'br': return '\n'
-        elif element.name == 'img': return f"![{element.get('alt','')}]({element.get('src','')})"
-        elif element.name in ['html', 'body', 'title']: return processed_children_content
-        return processed_children_content.strip() if processed_children_content.strip() else ""
+                cells.extend([''] * (len(header) - len(cells)))
+                body.append('| ' + ' | '.join(cells) + ' |\n')
+            width = max(width, len(cells))
+        if header is None:
+            return "\n\n"
+        header.extend([''] * (width - len(header)))
+        alignments.extend([None] * (width - len(alignments)))
+        separator = '| ' + ' | '.join(TABLE_ALIGNMENT_RULES[alignment] for alignment in alignments) + ' |\n'
+        return '| ' + ' | '.join(header) + ' |\n' + separator + ''.join(body) + '\n'
+
+    def _code_language(self, pre, code_tag):
+        # Declared language first: a class on <code> or <pre>, then the header
+        # label preprocessing moved onto <pre>
+        if code_tag is not None:
+            language = class_language(tuple(code_tag.get('class', ())))
+            if language: return language
+        return (class_language(tuple(pre.get('class', ())))
+                or header_language(pre.get('data-language', '')))
+
+    def _convert_pre(self, element, content, context):
+        indent_str = self.indent_char * context.nesting_level
+        code_tag = element.find('code')
+        code = normalize_code((element if code_tag is None else code_tag).get_text(), indent_str)
+        lang = self._code_language(element, code_tag)
+        if not lang and self.guess_code_language:
+            lang = guess_language(code)
+        return f"{indent_str}```{lang}\n{code}\n{indent_str}```\n\n"
+
+    def _convert_code(self, element, content, context):
+        if context.in_pre: return content
+        text = content.strip()
+        if '`' not in text: return f'`{text}`'
+        ticks = '``'; padding = " " if text.startswith('`') or text.endswith('`') or ' ' not in text else ""
+        while f'{ticks}{padding}{text}{padding}{ticks}'.count('`') % 2 != 0 or ticks in text : ticks += '`' ; padding = " "
+        return f"{ticks}{padding}{text}{padding}{ticks}"
+
+    def _convert_br(self, element, content, context):
+        return '\n'
+
+    def _convert_img(self, element, content, context):
+        alt = text_escaper(context.in_cell, True)(element.get('alt', ''))
+        return f"![{alt}]({self._attribute_text(element.get('src', ''), context)})"
 
 if __name__ == '__main__':
     # ... (examples remain the same)
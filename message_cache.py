@@ -0,0 +1,180 @@
+import os
+import sqlite3
+from collections import OrderedDict
+
+from markdown_enhancer import CONVERTER_VERSION
+
+DEFAULT_MEMORY_BYTES = 32 * 1024 * 1024
+DEFAULT_DISK_BYTES = 512 * 1024 * 1024
+# Disk writes are committed in batches of this many, so a worker never holds
+# SQLite's write lock for long while other processes share the file
+WRITE_BATCH = 32
+
+
+class MessageCache:
+    """Content-addressed cache of converted messages.
+
+    Keys are the digests computed by `EnhancedMarkdownConverter` over a
+    message's preprocessed subtree, so per-export noise such as element ids or
+    Angular attributes does not defeat it. Lookups go to an in-memory LRU first
+    and then, if `path` is given, to a SQLite file shared across runs and
+    processes. Both tiers are bounded in bytes and evict least recently used
+    entries. The SQLite file is stamped with the converter version and emptied
+    when it does not match.
+
+    The cache never fails a conversion: a SQLite error (a lock held past the
+    timeout, a corrupt file) counts in `errors` and behaves as a miss, or
+    drops the pending writes.
+    """
+
+    def __init__(self, path=None, max_memory_bytes=DEFAULT_MEMORY_BYTES, max_disk_bytes=DEFAULT_DISK_BYTES,
+                 version=CONVERTER_VERSION):
+        self.path = path
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.version = str(version)
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._db = None
+        self._clock = 0
+        # Rows and last-used updates waiting for the next batch commit
+        self._pending_rows = []
+        self._pending_touches = []
+        # Running estimate of the disk tier's size; other processes may write too,
+        # so it is only used to decide when the real total is worth computing
+        self._disk_bytes = 0
+        if path:
+            try:
+                self._open_db()
+            except sqlite3.Error:
+                # Memory tier only
+                self.errors += 1
+                self._close_db()
+
+    def _close_db(self):
+        if self._db is not None:
+            try:
+                self._db.close()
+            except sqlite3.Error:
+                pass
+            self._db = None
+
+    def _open_db(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=30)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        self._db.execute('CREATE TABLE IF NOT EXISTS messages '
+                         '(key TEXT PRIMARY KEY, markdown TEXT, size INTEGER, last_used INTEGER)')
+        self._db.execute('CREATE INDEX IF NOT EXISTS messages_last_used ON messages (last_used)')
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'converter'").fetchone()
+        if row is None or row[0] != self.version:
+            self._db.execute('DELETE FROM messages')
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('converter', ?)", (self.version,))
+        self._clock, self._disk_bytes = self._db.execute(
+            'SELECT COALESCE(MAX(last_used), 0), COALESCE(SUM(size), 0) FROM messages').fetchone()
+        self._db.commit()
+
+    def _remember(self, key, markdown):
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = markdown
+        self._memory_bytes += len(markdown)
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key):
+        markdown = self._memory.get(key)
+        if markdown is not None:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return markdown
+        if self._db is not None:
+            try:
+                row = self._db.execute('SELECT markdown FROM messages WHERE key = ?', (key,)).fetchone()
+            except sqlite3.Error:
+                self.errors += 1
+                row = None
+            if row is not None:
+                self._clock += 1
+                self._pending_touches.append((self._clock, key))
+                self._remember(key, row[0])
+                self.hits += 1
+                self._write_batch()
+                return row[0]
+        self.misses += 1
+        return None
+
+    def put(self, key, markdown):
+        self._remember(key, markdown)
+        if self._db is not None:
+            self._clock += 1
+            self._pending_rows.append((key, markdown, len(markdown), self._clock))
+            self._disk_bytes += len(markdown)
+            self._write_batch()
+
+    def _write_batch(self, force=False):
+        if not force and len(self._pending_rows) + len(self._pending_touches) < WRITE_BATCH:
+            return
+        rows, touches = self._pending_rows, self._pending_touches
+        self._pending_rows, self._pending_touches = [], []
+        try:
+            # One short transaction per batch
+            with self._db:
+                self._db.executemany('INSERT OR REPLACE INTO messages VALUES (?, ?, ?, ?)', rows)
+                self._db.executemany('UPDATE messages SET last_used = ? WHERE key = ?', touches)
+        except sqlite3.Error:
+            self.errors += 1
+
+    def _evict_disk(self):
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        total = self._disk_bytes = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM messages').fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        # Drop least recently used rows until the cache is back under 90% of its budget
+        excess = total - int(self.max_disk_bytes * 0.9)
+        rows = self._db.execute('SELECT key, size FROM messages ORDER BY last_used')
+        doomed = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            doomed.append((key,))
+            excess -= size
+        rows.close()
+        self._db.executemany('DELETE FROM messages WHERE key = ?', doomed)
+        self._disk_bytes = int(self.max_disk_bytes * 0.9) + min(excess, 0)
+
+    def flush(self):
+        """Commits pending writes and enforces the disk budget."""
+        if self._db is not None:
+            self._write_batch(force=True)
+            try:
+                with self._db:
+                    self._evict_disk()
+            except sqlite3.Error:
+                self.errors += 1
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            self._close_db()
+
+
+_default_cache = None
+
+
+def set_default_cache(cache):
+    """Sets the cache the conversion pipeline uses when none is passed."""
+    global _default_cache
+    _default_cache = cache
+    return cache
+
+
+def get_default_cache():
+    return _default_cache
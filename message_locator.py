@@ -0,0 +1,180 @@
+import mmap
+import re
+from collections import namedtuple
+from contextlib import contextmanager
+from html.parser import HTMLParser
+
+# Attribute values that only occur on (or inside) message containers
+ANCHORS = (b'model-response-message-contentr_', b'query-text-line')
+TAG_NAME_PATTERN = re.compile(rb'<([A-Za-z][^\s/>]*)')
+# A start tag up to (not including) its closing '>': quoted attribute values
+# may contain '>' and '<'
+START_TAG_PATTERN = re.compile(rb'<[A-Za-z][^\s/>]*(?:[^>"\']+|"[^"]*"|\'[^\']*\')*')
+TITLE_PATTERN = re.compile(rb'<title[\s>].*?</title\s*>', re.IGNORECASE | re.DOTALL)
+
+# Regions whose content html.parser never turns into tags: comments and its
+# CDATA elements (script, style), plus the RCDATA ones (textarea, title) on
+# Python versions whose html.parser has them
+RAW_TEXT = tuple((b'<' + name.encode(), b'</' + name.encode())
+                 for name in HTMLParser.CDATA_CONTENT_ELEMENTS + getattr(HTMLParser, 'RCDATA_CONTENT_ELEMENTS', ())
+                 ) + ((b'<!--', b'-->'),)
+
+MessageSpan = namedtuple('MessageSpan', ['start', 'end', 'tag'])
+
+# Bytes copied at a time when counting over a range of the map
+COUNT_CHUNK_BYTES = 1 << 20
+UTF8_CONTINUATION_BYTES = bytes(range(0x80, 0xc0))
+
+
+@contextmanager
+def open_html_map(html_file):
+    """Memory-maps `html_file` read-only; empty files yield b''."""
+    with open(html_file, 'rb') as f:
+        try:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            yield b''
+            return
+        try:
+            yield buffer
+        finally:
+            buffer.close()
+
+
+def _element_end(buffer, tag, open_end):
+    # Byte offset just past the end tag matching the start tag ending at `open_end`,
+    # counting nested elements of the same name. Unclosed elements run to EOF,
+    # which is where html.parser closes them too.
+    pattern = re.compile(rb'<(/?)' + re.escape(tag) + rb'(?=[\s/>])', re.IGNORECASE)
+    depth = 1
+    for match in pattern.finditer(buffer, open_end):
+        tag_end = buffer.find(b'>', match.end())
+        if tag_end < 0:
+            break
+        if match.group(1):
+            depth -= 1
+            if depth == 0:
+                return tag_end + 1
+        elif buffer[tag_end - 1:tag_end] != b'/':
+            depth += 1
+    return len(buffer)
+
+
+def _in_raw_text(buffer, start, floor):
+    # Whether `start` falls inside a script, style, textarea or comment opened after `floor`
+    for opener, closer in RAW_TEXT:
+        opened = buffer.rfind(opener, floor, start)
+        if opened >= 0 and buffer.find(closer, opened + len(opener), start) < 0:
+            return True
+    return False
+
+
+def _enclosing_start_tag(buffer, position, floor):
+    # The START_TAG_PATTERN match of the start tag that contains `position`,
+    # opened after `floor`, or None. A '<' found by searching backwards may sit
+    # inside a quoted value of an earlier tag, so earlier tags are tried while
+    # they extend past it.
+    start = buffer.rfind(b'<', floor, position)
+    match = START_TAG_PATTERN.match(buffer, start) if start >= 0 else None
+    while start >= 0:
+        earlier = buffer.rfind(b'<', floor, start)
+        enclosing = START_TAG_PATTERN.match(buffer, earlier) if earlier >= 0 else None
+        if enclosing is None or enclosing.end() <= start:
+            break
+        start, match = earlier, enclosing
+    return match if match is not None and match.end() > position else None
+
+
+def locate_message_spans(buffer):
+    """Yields a MessageSpan for every element whose start tag carries a message
+    anchor, in document order and without overlaps.
+
+    Only the raw bytes are scanned: nothing is decoded and no tree is built.
+    Anchors outside a start tag (inline CSS selectors, plain text) or inside
+    scripts, styles and comments are ignored.
+    A span may be wider than the message itself, e.g. a wrapper whose class merely
+    contains `query-text-line`; parsing it with `main.iter_message_elements`
+    finds the actual messages inside.
+    """
+    # Each anchor is searched with bytes.find, many times faster than a regex
+    # alternation over megabytes of inlined assets; the two cursors are merged
+    # in document order
+    cursors = {anchor: buffer.find(anchor) for anchor in ANCHORS}
+    position = 0
+    while True:
+        found = [(offset, anchor) for anchor, offset in cursors.items() if offset >= 0]
+        if not found:
+            return
+        anchor_start, anchor = min(found)
+        cursors[anchor] = buffer.find(anchor, anchor_start + 1)
+        tag_match = _enclosing_start_tag(buffer, anchor_start, position)
+        if tag_match is None or _in_raw_text(buffer, tag_match.start(), position):
+            continue
+        start, open_end = tag_match.span()
+        name = TAG_NAME_PATTERN.match(buffer, start)
+        if buffer[open_end:open_end + 1] != b'>':
+            continue
+        tag = name.group(1).lower()
+        end = open_end + 1 if buffer[open_end - 1:open_end] == b'/' else _element_end(buffer, tag, open_end + 1)
+        yield MessageSpan(start, end, tag.decode('ascii', 'replace'))
+        position = end
+        # Anchors inside this span belong to it
+        for other, offset in cursors.items():
+            if 0 <= offset < position:
+                cursors[other] = buffer.find(other, position)
+
+
+def locate_title(buffer):
+    """Returns the bytes of the first <title> element, or None."""
+    match = TITLE_PATTERN.search(buffer)
+    return match.group(0) if match else None
+
+
+# Class names used by the heuristic extractors' containers
+CONTAINER_MARKERS = (b'conversation-container', b'chat-container', b'chat-history')
+
+
+def _count(buffer, needle):
+    # mmap objects have find() but no count()
+    count, offset = 0, buffer.find(needle)
+    while offset >= 0:
+        count += 1
+        offset = buffer.find(needle, offset + len(needle))
+    return count
+
+
+def _chunks(buffer, start, end):
+    for offset in range(start, end, COUNT_CHUNK_BYTES):
+        yield buffer[offset:min(offset + COUNT_CHUNK_BYTES, end)]
+
+
+def advance_position(buffer, start, end, line, column):
+    """Returns the (line, column) of `end`, given those of `start`.
+
+    Columns count characters, as html.parser does on decoded text, which for
+    UTF-8 are the bytes that do not continue a character. Nothing is decoded
+    and the range is read in bounded chunks: on single-line SingleFile exports
+    the range between two messages can be most of the file, inlined assets
+    included.
+    """
+    last_newline = buffer.rfind(b'\n', start, end)
+    if last_newline >= 0:
+        line += sum(chunk.count(b'\n') for chunk in _chunks(buffer, start, last_newline + 1))
+        column, start = 0, last_newline + 1
+    for chunk in _chunks(buffer, start, end):
+        column += len(chunk) if chunk.isascii() else len(chunk.translate(None, UTF8_CONTINUATION_BYTES))
+    return line, column
+
+
+def probe_html(buffer):
+    """Cheap byte-level survey used to choose an extraction strategy.
+
+    Returns how many times each message anchor occurs (a substring count, so it
+    may include CSS selectors) and whether any heuristic container class shows up.
+    """
+    return {
+        'size': len(buffer),
+        'responses': _count(buffer, ANCHORS[0]),
+        'queries': _count(buffer, ANCHORS[1]),
+        'containers': any(buffer.find(marker) >= 0 for marker in CONTAINER_MARKERS),
+    }
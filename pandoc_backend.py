@@ -0,0 +1,98 @@
+import functools
+import shutil
+import subprocess
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+PANDOC_COMMAND = ('pandoc', '--from', 'html', '--to', 'markdown')
+DEFAULT_TIMEOUT = 120
+
+
+class PandocError(RuntimeError):
+    pass
+
+
+@functools.lru_cache(maxsize=None)
+def pandoc_version():
+    """Returns the first line of `pandoc --version`, or None when pandoc is not
+    installed. The check runs once per process."""
+    executable = shutil.which(PANDOC_COMMAND[0])
+    if executable is None:
+        return None
+    try:
+        result = subprocess.run([executable, '--version'], check=True,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    return result.stdout.decode('utf-8', 'replace').split('\n', 1)[0]
+
+
+def pandoc_available():
+    return pandoc_version() is not None
+
+
+def pandoc_to_markdown(html, timeout=DEFAULT_TIMEOUT):
+    """Converts an HTML string with pandoc, piping it through stdin and stdout.
+
+    Nothing is written to disk. Raises PandocError when pandoc is missing,
+    fails or takes longer than `timeout` seconds.
+    """
+    if not pandoc_available():
+        raise PandocError("pandoc is not installed")
+    try:
+        result = subprocess.run(PANDOC_COMMAND, input=html.encode('utf-8'), timeout=timeout,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    except subprocess.TimeoutExpired:
+        raise PandocError(f"pandoc took longer than {timeout}s")
+    if result.returncode != 0:
+        message = result.stderr.decode('utf-8', 'replace').strip()
+        raise PandocError(message or f"pandoc exited with status {result.returncode}")
+    return result.stdout.decode('utf-8')
+
+
+class PandocPool:
+    """Runs up to `max_workers` pandoc processes at a time.
+
+    pandoc has no request/response mode, so each conversion is still its own
+    process; the pool keeps several of them busy at once. The threads only wait
+    on the pipes, so they do not contend for the GIL.
+    """
+
+    def __init__(self, max_workers=4, timeout=DEFAULT_TIMEOUT):
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pandoc')
+
+    def submit(self, html):
+        return self._executor.submit(pandoc_to_markdown, html, self.timeout)
+
+    def map(self, htmls):
+        """Yields the Markdown of each HTML string in input order.
+
+        At most 2 * max_workers inputs are held at once, so `htmls` can be an
+        arbitrarily long generator. A failed conversion yields its PandocError
+        instead of stopping the others.
+        """
+        pending = deque()
+        for html in htmls:
+            pending.append(self.submit(html))
+            if len(pending) >= 2 * self.max_workers:
+                yield _result_or_error(pending.popleft())
+        while pending:
+            yield _result_or_error(pending.popleft())
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _result_or_error(future):
+    try:
+        return future.result()
+    except PandocError as e:
+        return e
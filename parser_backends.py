@@ -0,0 +1,110 @@
+from bs4 import BeautifulSoup
+from bs4.builder import HTMLParserTreeBuilder
+from bs4.element import Comment
+
+DEFAULT_BACKEND = 'html.parser'
+KNOWN_BACKENDS = ['html.parser', 'lxml', 'html5lib', 'selectolax']
+# Order in which 'auto' picks a backend. html5lib is slower than html.parser,
+# so it is only used when asked for by name.
+AUTO_PREFERENCE = ['lxml', 'selectolax', 'html.parser']
+
+
+class SelectolaxTreeBuilder(HTMLParserTreeBuilder):
+    """Builds a BeautifulSoup tree from selectolax's lexbor (HTML5) parser.
+
+    lexbor tokenizes and builds its DOM in C; this builder only replays that DOM
+    through BeautifulSoup's tree-construction API, so the resulting soup behaves
+    like any other and the extractors and converter need no changes.
+    """
+    NAME = 'selectolax'
+    ALTERNATE_NAMES = ['lexbor']
+    features = [NAME] + ALTERNATE_NAMES
+
+    def feed(self, markup):
+        from selectolax.lexbor import LexborHTMLParser
+        soup = self.soup
+        stack = []
+        node = LexborHTMLParser(markup).root
+        while node is not None:
+            tag = node.tag
+            if tag == '-text':
+                soup.handle_data(node.text_content)
+            elif tag == '-comment':
+                soup.endData()
+                # comment_content is stripped; the serialized node is not
+                soup.handle_data(node.html[4:-3])
+                soup.endData(Comment)
+            elif not tag.startswith('-'):
+                attrs = {name: '' if value is None else value for name, value in node.attributes.items()}
+                soup.handle_starttag(tag, None, None, attrs)
+                if node.child is not None:
+                    stack.append(node)
+                    node = node.child
+                    continue
+                soup.handle_endtag(tag)
+            while node.next is None and stack:
+                node = stack.pop()
+                soup.handle_endtag(node.tag)
+            node = node.next
+
+
+def _detect_backends():
+    available = ['html.parser']
+    try:
+        import lxml  # noqa: F401
+        available.append('lxml')
+    except ImportError:
+        pass
+    try:
+        import html5lib  # noqa: F401
+        available.append('html5lib')
+    except ImportError:
+        pass
+    try:
+        import selectolax.lexbor  # noqa: F401
+        available.append('selectolax')
+    except ImportError:
+        pass
+    return available
+
+
+AVAILABLE_BACKENDS = _detect_backends()
+
+_default_backend = DEFAULT_BACKEND
+_warned_missing = set()
+
+
+def resolve_backend(name=None):
+    """Maps a backend name (None, 'auto' or one of KNOWN_BACKENDS) to one that
+    is installed, falling back to html.parser when it is not."""
+    if not name:
+        return _default_backend
+    if name == 'auto':
+        return next(b for b in AUTO_PREFERENCE if b in AVAILABLE_BACKENDS)
+    if name not in KNOWN_BACKENDS:
+        raise ValueError(f"Unknown parser backend '{name}'. Choose one of: auto, {', '.join(KNOWN_BACKENDS)}")
+    if name not in AVAILABLE_BACKENDS:
+        if name not in _warned_missing:
+            print(f"⚠️ El parser '{name}' no está instalado; se usa '{DEFAULT_BACKEND}'. Instálalo con 'pip install {name}'")
+            _warned_missing.add(name)
+        return DEFAULT_BACKEND
+    return name
+
+
+def set_default_backend(name):
+    """Sets the backend used wherever no explicit backend is passed."""
+    global _default_backend
+    _default_backend = DEFAULT_BACKEND
+    _default_backend = resolve_backend(name)
+    return _default_backend
+
+
+def get_default_backend():
+    return _default_backend
+
+
+def make_soup(markup, backend=None):
+    backend = resolve_backend(backend)
+    if backend == 'selectolax':
+        return BeautifulSoup(markup, builder=SelectolaxTreeBuilder)
+    return BeautifulSoup(markup, backend)
@@ -5,6 +5,7 @@ import os
 # Add parent directory to sys.path to allow imports from markdown_enhancer
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from bs4 import BeautifulSoup
 from markdown_enhancer import EnhancedMarkdownConverter
 
 class TestBasicConversion(unittest.TestCase):
@@ -111,5 +112,37 @@ class TestBasicConversion(unittest.TestCase):
         expected_md = '\n\n\n\n' # Two newlines from <p>, then two from <ul> (as it's empty after filtering)
         self.assertEqual(self.converter.convert(html).strip(), expected_md.strip())
 
+    def test_convert_element_matches_prettify_round_trip(self):
+        html = ('<div id="m"><p>Text <span>inside span</span> and <b>bold</b><!-- c --></p>'
+                '<script>x()</script><ul><li>One<ul><li>Nested</li></ul></li></ul>'
+                '<pre><code class="language-python">  a = 1\n  b = 2</code></pre></div>')
+        element = BeautifulSoup(html, 'html.parser').div
+        self.assertEqual(self.converter.convert_element(element), self.converter.convert(element.prettify()))
+        self.assertEqual(self.converter.convert_element(element, pretty=False), self.converter.convert(str(element)))
+
+    def test_convert_element_leaves_tree_untouched(self):
+        soup = BeautifulSoup('<div id="m"><p style="x">A <span>B</span></p><style>.a{}</style></div>', 'html.parser')
+        before = str(soup)
+        self.converter.convert_element(soup.div)
+        self.assertEqual(str(soup), before)
+
+    def test_deeply_nested_wrappers(self):
+        depth = 1500  # past the default recursion limit
+        html = '<div class="x">' * depth + '<p>Deep <b>text</b></p>' + '<span>s</span>' + '</div>' * depth
+        self.assertEqual(self.converter.convert(html).strip(), 'Deep **text**\n\ns')
+        element = BeautifulSoup(html, 'html.parser').div
+        self.assertEqual(self.converter.convert_element(element), self.converter.convert(element.prettify()))
+
+    def test_register_custom_handlers(self):
+        self.converter.register_handler('math-inline', lambda element, content, level: f'${content.strip()}$')
+        self.converter.register_handler('source-footnote', lambda element, content, level: f'[^{element.get_text(strip=True)}]',
+                                        convert_children=False)
+        html = '<p>Area <math-inline>\\pi r^2</math-inline><source-footnote><b>1</b></source-footnote></p>'
+        self.assertEqual(self.converter.convert(html).strip(), 'Area $\\pi r^2$[^1]')
+        # Overriding a built-in only affects this converter
+        self.converter.register_handler('b', lambda element, content, level: f'__{content.strip()}__')
+        self.assertEqual(self.converter.convert('<p><b>x</b></p>').strip(), '__x__')
+        self.assertEqual(EnhancedMarkdownConverter().convert('<p><b>x</b></p>').strip(), '**x**')
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,203 @@
+import unittest
+import sys
+import os
+import io
+import tempfile
+import contextlib
+import multiprocessing
+from unittest import mock
+
+# Add parent directory to sys.path to allow imports from main
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from conversion_manifest import ConversionManifest, MANIFEST_NAME
+
+CHAT_HTML = """<html><head><title>Chat {n}</title></head><body>
+<p class="query-text-line">Pregunta {n}</p>
+<div id="model-response-message-contentr_{n}"><p>Respuesta <b>{n}</b></p></div>
+</body></html>
+"""
+
+STREAM_GEMINI_MARKDOWN = main.stream_gemini_markdown
+
+def crash_on_chat2(html_file, out, **options):
+    # Stands in for a worker killed by the OS (OOM, segfault) on one file
+    if html_file.endswith('chat2.html'):
+        os._exit(1)
+    return STREAM_GEMINI_MARKDOWN(html_file, out, **options)
+
+class TestBatchConversion(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input_dir = self.tmpdir.name
+        for n in range(6):
+            with open(os.path.join(self.input_dir, f'chat{n}.html'), 'w', encoding='utf-8') as f:
+                f.write(CHAT_HTML.format(n=n))
+        # Not valid UTF-8: must fail on its own without stopping the batch
+        with open(os.path.join(self.input_dir, 'chat3.html'), 'wb') as f:
+            f.write(b'\xff\xfe<p class="query-text-line">x</p>')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _tasks(self):
+        for n in range(6):
+            yield (os.path.join(self.input_dir, f'chat{n}.html'), os.path.join(self.input_dir, f'chat{n}.md'))
+
+    def _run(self, jobs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return list(main.run_conversions(self._tasks(), jobs=jobs))
+
+    def test_results_keep_input_order_and_isolate_errors(self):
+        for jobs in (1, 3):
+            with self.subTest(jobs=jobs):
+                results = self._run(jobs)
+                self.assertEqual([os.path.basename(r['input']) for r in results], [f'chat{n}.html' for n in range(6)])
+                self.assertEqual([r['error'] is None for r in results], [True, True, True, False, True, True])
+                with open(results[5]['output'], encoding='utf-8') as f:
+                    self.assertIn('Respuesta **5**', f.read())
+
+    def test_parallel_output_matches_sequential(self):
+        sequential = []
+        for result in self._run(1):
+            if result['output']:
+                with open(result['output'], encoding='utf-8') as f:
+                    sequential.append(f.read().split('\n', 3)[3])
+        parallel = []
+        for result in self._run(2):
+            if result['output']:
+                with open(result['output'], encoding='utf-8') as f:
+                    parallel.append(f.read().split('\n', 3)[3])
+        self.assertEqual(parallel, sequential)
+
+    @unittest.skipUnless(multiprocessing.get_start_method() == 'fork', 'workers must inherit the patched function')
+    def test_dead_worker_only_fails_its_file(self):
+        with mock.patch.object(main, 'stream_gemini_markdown', crash_on_chat2):
+            results = self._run(3)
+        self.assertEqual([os.path.basename(r['input']) for r in results], [f'chat{n}.html' for n in range(6)])
+        self.assertEqual([r['error'] is None for r in results], [True, True, False, False, True, True])
+        self.assertIn('terminated abruptly', results[2]['error'])
+
+    def test_folder_summary(self):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main.process_conversations_folder(self.input_dir, jobs=2)
+        self.assertIn('5/6 archivos convertidos', output.getvalue())
+        self.assertIn('archivos/s', output.getvalue())
+        self.assertEqual(output.getvalue().count('chat3.html'), 1)
+
+REPEATED_HTML = """<html><head><title>Repetido</title></head><body>
+<p class="query-text-line">Otra vez</p>
+<div id="model-response-message-contentr_1"><p>Hecho</p></div>
+<p class="query-text-line">Otra vez</p>
+</body></html>
+"""
+
+class TestDedupOption(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.tmpdir.name, 'chat.html'), 'w', encoding='utf-8') as f:
+            f.write(REPEATED_HTML)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _convert(self, dedup):
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main.process_conversations_folder(self.tmpdir.name, dedup=dedup)
+        with open(os.path.join(self.tmpdir.name, 'chat.md'), encoding='utf-8') as f:
+            return f.read().count('Otra vez'), output.getvalue()
+
+    def test_scope_reaches_the_output_and_the_manifest(self):
+        self.assertEqual(self._convert('global')[0], 1)
+        # Only the previous message is compared, and changing the scope invalidates the manifest
+        count, output = self._convert('adjacent')
+        self.assertEqual(count, 2)
+        self.assertIn('1/1 archivos convertidos', output)
+
+class TestConversionManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input_path = os.path.join(self.tmpdir.name, 'chat.html')
+        self.output_path = os.path.join(self.tmpdir.name, 'chat.md')
+        self.manifest_path = os.path.join(self.tmpdir.name, MANIFEST_NAME)
+        with open(self.input_path, 'w', encoding='utf-8') as f:
+            f.write(CHAT_HTML.format(n=1))
+        with open(self.output_path, 'w', encoding='utf-8') as f:
+            f.write('# chat')
+        manifest = ConversionManifest.load(self.manifest_path, 1, {'streaming': False})
+        manifest.record(self.input_path, self.output_path)
+        manifest.save()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _up_to_date(self, version=1, options=None):
+        manifest = ConversionManifest.load(self.manifest_path, version, options or {'streaming': False})
+        return manifest.is_up_to_date(self.input_path, self.output_path)
+
+    def test_unchanged_file_is_skipped(self):
+        self.assertTrue(self._up_to_date())
+
+    def test_touched_but_identical_file_is_skipped(self):
+        st = os.stat(self.input_path)
+        os.utime(self.input_path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        self.assertTrue(self._up_to_date())
+
+    def test_changes_trigger_reconversion(self):
+        self.assertFalse(self._up_to_date(version=2))
+        self.assertFalse(self._up_to_date(options={'streaming': True}))
+        with open(self.input_path, 'a', encoding='utf-8') as f:
+            f.write('<!-- new turn -->')
+        self.assertFalse(self._up_to_date())
+
+    def test_missing_output_triggers_reconversion(self):
+        os.remove(self.output_path)
+        self.assertFalse(self._up_to_date())
+
+    def test_folder_run_skips_unchanged_files(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.process_conversations_folder(self.tmpdir.name)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            main.process_conversations_folder(self.tmpdir.name)
+        self.assertIn('0/0 archivos convertidos', output.getvalue())
+        self.assertIn('1 archivos sin cambios omitidos', output.getvalue())
+
+class TestDirectoryWalker(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.input_dir = os.path.join(self.tmpdir.name, 'archive')
+        for rel_path in ['top.html', 'notes.txt', '2025/06/a.html', '2025/06/b.htm', '2025/07/c.html', 'drafts/d.html']:
+            path = os.path.join(self.input_dir, *rel_path.split('/'))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(CHAT_HTML.format(n=len(rel_path)))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _walk(self, **kwargs):
+        return [p.replace(os.sep, '/') for p in main.iter_html_files(self.input_dir, **kwargs)]
+
+    def test_top_level_only_by_default(self):
+        self.assertEqual(self._walk(), ['top.html'])
+
+    def test_recursive_with_globs(self):
+        self.assertEqual(self._walk(recursive=True), ['top.html', '2025/06/a.html', '2025/07/c.html', 'drafts/d.html'])
+        self.assertEqual(self._walk(recursive=True, include=['*.htm', '*.html'], exclude=['drafts', '2025/07/*']),
+                         ['top.html', '2025/06/a.html', '2025/06/b.htm'])
+
+    def test_output_tree_mirrors_input(self):
+        output_dir = os.path.join(self.tmpdir.name, 'markdown')
+        with contextlib.redirect_stdout(io.StringIO()):
+            main.process_conversations_folder(self.input_dir, output_dir=output_dir, recursive=True, exclude=['drafts'])
+        written = sorted(os.path.relpath(os.path.join(d, f), output_dir).replace(os.sep, '/')
+                         for d, _, files in os.walk(output_dir) for f in files if f.endswith('.md'))
+        self.assertEqual(written, ['2025/06/a.md', '2025/07/c.md', 'top.md'])
+        self.assertFalse(os.path.exists(os.path.join(self.input_dir, 'top.md')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import sys
+import os
+import random
+
+# Add parent directory to sys.path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from code_blocks import guess_language, header_language, normalize_code
+from markdown_enhancer import EnhancedMarkdownConverter
+
+def line_by_line_normalize(text):
+    # The per-line dedent/trim normalize_code replaces
+    lines = [line.rstrip() for line in text.splitlines()]
+    indents = [len(line) - len(line.lstrip()) for line in lines if line.strip()]
+    indent = min(indents) if indents else 0
+    lines = [line[indent:] for line in lines]
+    while lines and not lines[0]: lines.pop(0)
+    while lines and not lines[-1]: lines.pop()
+    return '\n'.join(lines)
+
+GEMINI_CODE_BLOCK = """
+<div class="code-block"><div class="code-block-decoration header-formatted"><span>C++</span>
+<div class="buttons"><button aria-label="Copy code"><mat-icon>content_copy</mat-icon></button></div></div>
+<div class="formatted-code-block-internal-container"><pre><code class="code-container formatted">
+    int main() {
+        return 0;
+    }
+</code></pre></div></div>
+"""
+
+class TestCodeBlocks(unittest.TestCase):
+    def test_normalize_matches_line_by_line_dedent(self):
+        rng = random.Random(3)
+        pieces = [' ', '  ', '\t', '\n', '\r\n', '\r', '\x0c', 'x = 1', 'if y:', ' ', '\n\n']
+        for _ in range(5000):
+            text = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 20)))
+            self.assertEqual(normalize_code(text), line_by_line_normalize(text), repr(text))
+        self.assertEqual(normalize_code('\n  a\n\n    b \n', '> '), '> a\n> \n>   b')
+
+    def test_header_language_and_guess(self):
+        self.assertEqual(header_language('Python'), 'python')
+        self.assertEqual(header_language(' C++ '), 'cpp')
+        self.assertEqual(header_language('Plain text'), '')
+        self.assertEqual(guess_language('import os\nprint(os.sep)'), 'python')
+        self.assertEqual(guess_language('$ git status'), 'bash')
+        self.assertEqual(guess_language('SELECT id FROM users;'), 'sql')
+        self.assertEqual(guess_language('hola mundo'), '')
+
+    def test_gemini_header_labels_the_fence(self):
+        converter = EnhancedMarkdownConverter()
+        self.assertEqual(converter.convert(GEMINI_CODE_BLOCK).strip(),
+                         '```cpp\nint main() {\n    return 0;\n}\n```')
+        # A class on <code> wins over the header
+        html = GEMINI_CODE_BLOCK.replace('code-container formatted', 'language-c')
+        self.assertTrue(converter.convert(html).strip().startswith('```c\n'))
+
+    def test_language_guess_is_opt_in(self):
+        html = '<pre><code>def f():\n    return 1</code></pre>'
+        self.assertEqual(EnhancedMarkdownConverter().convert(html).strip(), '```\ndef f():\n    return 1\n```')
+        converter = EnhancedMarkdownConverter(guess_code_language=True)
+        self.assertEqual(converter.convert(html).strip(), '```python\ndef f():\n    return 1\n```')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import sys
+import os
+import re
+import tempfile
+
+# Add parent directory to sys.path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from conversation_model import Message
+from html2text_engine import get_html2text_converter, html2text, html2text_available, html2text_to_markdown
+from test_pipeline import SAMPLE_HTML
+
+@unittest.skipUnless(html2text_available(), 'html2text is not installed')
+class TestHtml2textEngine(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, html):
+        path = os.path.join(self.tmpdir.name, 'chat.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        return path
+
+    def test_converter_is_reused_without_leaking_state(self):
+        converter = get_html2text_converter()
+        self.assertEqual(html2text_to_markdown('<ol><li>uno</li></ol>'), '  1. uno\n\n')
+        self.assertEqual(html2text_to_markdown('<p><a href="https://x.org">enlace</a></p>'), '[enlace](https://x.org)\n\n')
+        self.assertEqual(html2text_to_markdown('<ol><li>uno</li></ol>'), '  1. uno\n\n')
+        self.assertIs(get_html2text_converter(), converter)
+
+    def test_table_state_does_not_reach_the_next_fragment(self):
+        html2text_to_markdown('<table><tr><th>a</th></tr><tr><td>1</td></tr></table>')
+        html = '<p>Pasos:</p><ul><li>uno</li><li>dos</li></ul>'
+        fresh = html2text.HTML2Text()
+        fresh.ignore_links = False
+        self.assertEqual(html2text_to_markdown(html), fresh.handle(html))
+
+    def test_gemini_export_converts_only_message_subtrees(self):
+        conversation = main.extract_conversation_with_html2text(self._write(SAMPLE_HTML))
+        self.assertEqual([(m.speaker, m.content) for m in conversation],
+                         [('Tú', 'Hola Gemini'), ('Gemini', 'Hola, **¿qué tal?**'),
+                          ('Tú', 'Dame una lista'), ('Gemini', '  * Uno\n  * Dos')])
+
+    def test_message_starting_with_a_list_keeps_its_indent(self):
+        html = ('<user-query><p class="query-text-line">Pasos</p></user-query>'
+                '<div id="model-response-message-contentr_1"><ol><li>uno</li><li>dos</li></ol><p>Fin</p></div>')
+        conversation = main.extract_conversation_with_html2text(self._write(html))
+        self.assertEqual(conversation[1].content, '  1. uno\n  2. dos\n\nFin')
+
+    def test_other_pages_are_split_on_speaker_markers(self):
+        html = ('<html><head><style>.a{}</style></head><body><p>Cabecera</p>'
+                '<p><b>Tú:</b> ¿Qué hora es?</p><p><b>Gemini:</b> Las <i>tres</i>.</p></body></html>')
+        conversation = main.extract_conversation_with_html2text(self._write(html))
+        self.assertEqual(conversation, [Message('Tú', '¿Qué hora es?'), Message('Gemini', 'Las _tres_.')])
+
+    def test_lazy_splitter_matches_re_split(self):
+        markdown = 'intro **Tú:** a\n\n**Gemini:** b **Tú:**  **Gemini:** c\n'
+        parts = re.split(r'\*\*(Tú|Gemini):\*\*', markdown)
+        expected = [Message(parts[i].strip(), parts[i + 1].strip()) for i in range(1, len(parts), 2)]
+        self.assertEqual(main.split_speaker_markdown(markdown), expected)
+        self.assertEqual(list(main.iter_speaker_markdown('sin marcadores')), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import sys
+import os
+import random
+
+# Add parent directory to sys.path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from keyword_matcher import KeywordMatcher
+
+class TestKeywordMatcher(unittest.TestCase):
+    def test_matches_substring_checks_on_random_blocks(self):
+        rng = random.Random(7)
+        vocabulary = main.USER_KEYWORDS + main.BOT_KEYWORDS + ['Tú', 'GEMINI:', 'hola', 'la', 'e', ' ', 'ste:', 'ayudar']
+        for _ in range(2000):
+            block = ''.join(rng.choice(vocabulary) for _ in range(rng.randint(0, 6)))
+            if any(k in block.lower() for k in main.USER_KEYWORDS):
+                expected = 'Tú'
+            elif any(k in block.lower() for k in main.BOT_KEYWORDS):
+                expected = 'Gemini'
+            else:
+                expected = None
+            self.assertEqual(main.TEXT_KEYWORD_MATCHER.classify(block), expected, block)
+
+    def test_overlapping_and_prefix_keywords(self):
+        # 'enviaste' begins with the last letter of 'puedo ayudarte'
+        self.assertEqual(main.TEXT_KEYWORD_MATCHER.classify('Puedo ayudarteenviaste'), 'Tú')
+        matcher = KeywordMatcher({'corto': ['abc'], 'largo': ['abcdef'], 'otro': ['defx']})
+        self.assertEqual(matcher.find('xxABCDEFx'), {'corto', 'largo', 'otro'})
+        self.assertEqual(matcher.classify('abcdef'), 'corto')
+        self.assertIsNone(matcher.classify('ab cd'))
+
+if __name__ == '__main__':
+    unittest.main()
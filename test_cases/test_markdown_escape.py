@@ -0,0 +1,62 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to sys.path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from markdown_enhancer import EnhancedMarkdownConverter
+from markdown_escape import escape_line_start, text_escaper
+
+class TestMarkdownEscape(unittest.TestCase):
+    def setUp(self):
+        self.converter = EnhancedMarkdownConverter()
+
+    def convert(self, html):
+        return self.converter.convert(html).strip()
+
+    def test_plain_text_is_returned_as_is(self):
+        text = 'Texto normal, con acentos y números 1 2 3.'
+        self.assertIs(text_escaper()(text, line_start=True), text)
+
+    def test_inline_syntax_in_paragraphs(self):
+        self.assertEqual(self.convert('<p>2 * 3, snake_case y _foo_ con `x` [y] &amp;copy; &lt;div&gt; 3 &lt; 4</p>'),
+                         '2 \\* 3, snake_case y \\_foo\\_ con \\`x\\` \\[y] \\&copy; \\<div> 3 < 4')
+        self.assertEqual(self.convert('<p>C:\\dir \\*x</p>'), 'C:\\dir \\\\\\*x')
+
+    def test_underscore_runs_are_escaped_whole(self):
+        # Escaping only the outer underscores of __init__ would leave _init_ as emphasis
+        self.assertEqual(self.convert('<p>def __init__(self)</p>'), 'def \\_\\_init\\_\\_(self)')
+        self.assertEqual(self.convert("<p>if __name__ == '__main__':</p>"),
+                         "if \\_\\_name\\_\\_ == '\\_\\_main\\_\\_':")
+        self.assertEqual(self.convert('<p>a__b snake_case _x</p>'), 'a__b snake_case \\_x')
+
+    def test_block_markers_only_at_line_start(self):
+        self.assertEqual(self.convert('<p># no</p><p>- no</p><p>2024. Año</p><p>&gt; no</p>'),
+                         '\\# no\n\n\\- no\n\n2024\\. Año\n\n\\> no')
+        self.assertEqual(self.convert('<p>a <b>b</b> - c #1</p>'), 'a **b** - c #1')
+        self.assertEqual(self.convert('<p>uno<br>- dos</p>'), 'uno\n\\- dos')
+        self.assertEqual(self.convert('<ul><li>+ uno</li></ul>'), '* \\+ uno')
+        self.assertEqual(escape_line_start(' 1) x'), ' 1\\) x')
+
+    def test_context_specific_rules(self):
+        self.assertEqual(self.convert('<h2>Issue #</h2>'), '## Issue \\#')
+        self.assertEqual(self.convert('<h3># C#</h3>'), '### # C#')
+        self.assertEqual(self.convert('<p><a href="u">a [b] c</a></p>'), '[a \\[b\\] c](u)')
+        self.assertEqual(self.convert('<p><code>a*b_c|d</code></p>'), '`a*b_c|d`')
+        self.assertEqual(self.convert('<pre>*x* | y</pre>'), '```\n*x* | y\n```')
+
+    def test_exclamation_mark_before_a_link(self):
+        self.assertEqual(self.convert('<p>!<a href="x">img?</a></p>'), '\\![img?](x)')
+        self.assertEqual(self.convert('<p><span>¡Hola!</span><a href="x">y</a></p>'), '¡Hola\\![y](x)')
+        self.assertEqual(self.convert('<ul><li>Ya!<a href="x">y</a></li></ul>'), '* Ya\\![y](x)')
+        self.assertEqual(self.convert('<p>! <a href="x">y</a></p>'), '! [y](x)')
+
+    def test_pipes_in_table_cells(self):
+        html = ('<table><tr><th>a|b</th><th><code>x|y</code></th></tr>'
+                '<tr><td><a href="h|i">l|m</a></td><td><img alt="p|q]" src="s"></td></tr></table>')
+        self.assertEqual(self.convert(html),
+                         '| a\\|b | `x\\|y` |\n| --- | --- |\n| [l\\|m](h\\|i) | ![p\\|q\\]](s) |')
+
+if __name__ == '__main__':
+    unittest.main()
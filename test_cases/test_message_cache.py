@@ -0,0 +1,122 @@
+import unittest
+import sys
+import os
+import io
+import tempfile
+import contextlib
+import sqlite3
+
+# Add parent directory to sys.path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from bs4 import BeautifulSoup
+from markdown_enhancer import EnhancedMarkdownConverter
+from message_cache import WRITE_BATCH, MessageCache, set_default_cache
+
+MESSAGE = """<div id="model-response-message-content{rid}" class="markdown" _ngcontent-ng-c{ng}="">
+<p>Usa <code>sorted()</code> y <a href="https://docs.python.org" class="x">la documentación</a>.</p>
+<ul><li>Uno</li><li>Dos <b>{extra}</b></li></ul></div>"""
+
+def _element(rid='r_1', ng='123', extra='fin'):
+    return BeautifulSoup(MESSAGE.format(rid=rid, ng=ng, extra=extra), 'html.parser').div
+
+class TestMessageCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'cache', 'messages.sqlite')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_hit_returns_same_markdown_and_ignores_export_noise(self):
+        expected = EnhancedMarkdownConverter().convert_element(_element())
+        cache = MessageCache()
+        converter = EnhancedMarkdownConverter(cache=cache)
+        self.assertEqual(converter.convert_element(_element()), expected)
+        # Another export of the same turn: different ids and Angular attributes
+        self.assertEqual(converter.convert_element(_element(rid='r_99', ng='777')), expected)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        converter.convert_element(_element(extra='otro'))
+        self.assertEqual(cache.misses, 2)
+
+    def test_key_covers_converter_configuration(self):
+        html = '<div><p>Area <math-inline>x^2</math-inline> <b>b</b></p></div>'
+        cache = MessageCache()
+        plain = EnhancedMarkdownConverter(cache=cache)
+        self.assertEqual(plain.convert_element(BeautifulSoup(html, 'html.parser').div), 'Area x^2 **b**')
+        custom = EnhancedMarkdownConverter(cache=cache)
+        custom.register_handler('math-inline', lambda element, content, context: f'${content.strip()}$')
+        self.assertEqual(custom.convert_element(BeautifulSoup(html, 'html.parser').div), 'Area $x^2$ **b**')
+        # Built-in handlers and attributes are part of the key
+        remapped = EnhancedMarkdownConverter(cache=cache)
+        remapped.register_handler('b', remapped._convert_em)
+        self.assertEqual(remapped.convert_element(BeautifulSoup(html, 'html.parser').div), 'Area x^2 *b*')
+        self.assertEqual(cache.hits, 0)
+        self.assertEqual(EnhancedMarkdownConverter(cache=cache).convert_element(BeautifulSoup(html, 'html.parser').div),
+                         'Area x^2 **b**')
+        self.assertEqual(cache.hits, 1)
+
+    def test_disk_tier_persists_and_is_version_stamped(self):
+        cache = MessageCache(self.db_path, version=1)
+        EnhancedMarkdownConverter(cache=cache).convert_element(_element())
+        cache.close()
+        reopened = MessageCache(self.db_path, version=1)
+        EnhancedMarkdownConverter(cache=reopened).convert_element(_element())
+        self.assertEqual(reopened.hits, 1)
+        reopened.close()
+        bumped = MessageCache(self.db_path, version=2)
+        EnhancedMarkdownConverter(cache=bumped).convert_element(_element())
+        self.assertEqual((bumped.hits, bumped.misses), (0, 1))
+        bumped.close()
+
+    def test_writes_commit_in_batches_and_errors_degrade_to_misses(self):
+        cache = MessageCache(self.db_path)
+        cache.put('a', 'uno')
+        other = sqlite3.connect(self.db_path, timeout=0)
+        # Between batches the write lock is free for other workers
+        other.execute('BEGIN IMMEDIATE')
+        other.rollback()
+        for n in range(WRITE_BATCH):
+            cache.put(f'k{n}', 'x')
+        self.assertEqual(other.execute('SELECT COUNT(*) FROM messages').fetchone()[0], WRITE_BATCH)
+        other.close()
+        # A broken database is a miss, never an exception
+        cache._db.close()
+        cache._memory.clear()
+        self.assertIsNone(cache.get('a'))
+        cache.put('b', 'dos')
+        cache.close()
+        self.assertGreater(cache.errors, 0)
+
+    def test_tiers_are_size_bounded(self):
+        cache = MessageCache(self.db_path, max_memory_bytes=250, max_disk_bytes=1000)
+        for n in range(20):
+            cache.put(f'k{n}', 'x' * 100)
+        self.assertLessEqual(cache._memory_bytes, 250)
+        self.assertIn('k19', cache._memory)
+        cache.flush()
+        total = cache._db.execute('SELECT SUM(size) FROM messages').fetchone()[0]
+        self.assertLessEqual(total, 1000)
+        # The most recently written entries survive eviction
+        self.assertEqual(cache.get('k19'), 'x' * 100)
+        self.assertIsNone(cache._db.execute("SELECT 1 FROM messages WHERE key = 'k0'").fetchone())
+        cache.close()
+
+    def test_pipeline_output_is_unchanged_with_cache(self):
+        html_file = os.path.join(self.tmpdir.name, 'chat.html')
+        with open(html_file, 'w', encoding='utf-8') as f:
+            f.write('<html><body><p class="query-text-line">Pregunta</p>' + MESSAGE.format(rid='r_1', ng='1', extra='x') + '</body></html>')
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = main.extract_gemini_conversation_singlepage(html_file)
+            cache = set_default_cache(MessageCache(self.db_path))
+            try:
+                self.assertEqual(main.extract_gemini_conversation_singlepage(html_file), expected)
+                self.assertEqual(main.extract_gemini_conversation_singlepage(html_file), expected)
+                self.assertEqual(cache.hits, 2)
+            finally:
+                set_default_cache(None)
+                cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import sys
+import os
+import io
+import tempfile
+import contextlib
+from unittest import mock
+
+# Add parent directory to sys.path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+import message_locator
+from message_locator import advance_position, locate_message_spans, locate_title, open_html_map
+
+ASSET_HEAVY_HTML = """<!DOCTYPE html>
+<html><head><title>Chat &amp; assets</title>
+<style>.query-text-line{color:red} #model-response-message-contentr_x{display:block}</style>
+<script>var tpl = '<p class="query-text-line">';</script></head>
+<body><img src="data:image/png;base64,{blob}">
+<user-query><div class="query-text-line-wrapper"><p class="query-text-line">Hola <b>Gemini</b></p></div></user-query>
+<model-response><div id="model-response-message-contentr_1"><div><p>Respuesta con <div>anidado</div></p></div>
+<ul><li>Uno</li></ul></div></model-response>
+<p>Texto que menciona query-text-line sin serlo</p>
+<user-query><p class="query-text-line">Otra</p></user-query>
+</body></html>
+"""
+
+class TestMessageLocator(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.html_file = os.path.join(self.tmpdir.name, 'chat (18_6_2025).html')
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write(ASSET_HEAVY_HTML.replace('{blob}', 'QUFB' * 50000))
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_spans_cover_message_elements_only(self):
+        with open_html_map(self.html_file) as buffer:
+            spans = [bytes(buffer[span.start:span.end]) for span in locate_message_spans(buffer)]
+            self.assertEqual(locate_title(buffer), b'<title>Chat &amp; assets</title>')
+        self.assertEqual(len(spans), 3)
+        self.assertTrue(spans[0].startswith(b'<div class="query-text-line-wrapper">'))
+        self.assertTrue(spans[0].endswith(b'</p></div>'))
+        self.assertTrue(spans[1].startswith(b'<div id="model-response-message-contentr_1">'))
+        self.assertTrue(spans[1].endswith(b'<ul><li>Uno</li></ul></div>'))
+        self.assertEqual(spans[2], b'<p class="query-text-line">Otra</p>')
+
+    def test_scan_reader_matches_full_parse(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = main.convert_to_gemini_markdown(self.html_file)
+            self.assertEqual(main.extract_gemini_conversation_located(self.html_file),
+                             main.extract_gemini_conversation_singlepage(self.html_file))
+            with mock.patch.object(main, 'make_soup', wraps=main.make_soup) as parser:
+                scanned = main.convert_to_gemini_markdown(self.html_file, reader='scan')
+        self.assertEqual(scanned.split('\n', 3)[3], expected.split('\n', 3)[3])
+        self.assertTrue(scanned.startswith('# 💬 Chat & assets\n'))
+        # Only the title and the message spans are parsed, never the inlined assets
+        self.assertLess(sum(len(call.args[0]) for call in parser.call_args_list), 1000)
+
+    def test_only_spans_are_decoded(self):
+        with open(self.html_file, 'ab') as f:
+            f.write(b'<!-- \xff\xfe not UTF-8 -->')
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(len(main.extract_gemini_conversation_located(self.html_file)), 3)
+
+    def test_positions_count_characters_without_decoding(self):
+        data = 'añadir\nCanción ñ €\n\nfin é'.encode('utf-8')
+        # Chunks of 3 bytes split multi-byte characters and newlines across chunk boundaries
+        with mock.patch.object(message_locator, 'COUNT_CHUNK_BYTES', 3):
+            for end in range(len(data) + 1):
+                text = data[:end].decode('utf-8', 'ignore')
+                expected = (1 + text.count('\n'), len(text) - text.rfind('\n') - 1)
+                if data[end:end + 1] and (data[end] & 0xc0) == 0x80:
+                    continue
+                self.assertEqual(advance_position(data, 0, end, 1, 0), expected, end)
+        self.assertEqual(advance_position(data, 3, 7, 1, 2), (1, 6))
+        self.assertEqual(advance_position(data, 3, 9, 1, 2), (2, 1))
+
+    def test_quoted_angle_brackets_in_start_tags(self):
+        html = ('<html><body><p aria-label="Pregunta > 1" title="a<b c" class="query-text-line">Hola</p>'
+                '<div data-tooltip="a>b" id="model-response-message-contentr_1"><p>Respuesta</p></div>'
+                '<textarea><p class="query-text-line">Dentro</p></textarea></body></html>')
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write(html)
+        with contextlib.redirect_stdout(io.StringIO()):
+            located = main.extract_gemini_conversation_located(self.html_file)
+            self.assertEqual(located, main.extract_gemini_conversation_singlepage(self.html_file))
+        self.assertEqual([m.content for m in located], ['Hola', 'Respuesta', 'Dentro'])
+
+    def test_empty_result_is_not_a_success(self):
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write('<html><body><p>Nada</p></body></html>')
+        output_path = os.path.join(self.tmpdir.name, 'chat.md')
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = main.convert_file(self.html_file, output_path, reader='scan')
+        self.assertIsNotNone(result['error'])
+        self.assertFalse(os.path.exists(output_path))
+
+    def test_empty_file(self):
+        open(self.html_file, 'w').close()
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(main.extract_gemini_conversation_located(self.html_file), [])
+
+if __name__ == '__main__':
+    unittest.main()
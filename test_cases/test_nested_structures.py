@@ -364,6 +364,64 @@ class TestNestedStructures(unittest.TestCase):
         # This will result in `> * Item\n> * Item2\n> `. This is also good.
         self.assertEqual(self.converter.convert(html), expected_md)
 
+    def test_nesting_deeper_than_recursion_limit(self):
+        depth = sys.getrecursionlimit() + 100
+        html = '<blockquote>' * depth + '<p>Deep</p>' + '</blockquote>' * depth
+        self.assertEqual(self.converter.convert(html), '> ' * depth + 'Deep')
+
+    def test_list_item_containing_only_a_sublist(self):
+        html = '<ul><li><ul><li>Nested</li></ul></li><li>After</li></ul>'
+        self.assertEqual(self.converter.convert(html), '*\n    * Nested\n* After')
+
+    def test_ordered_list_start_and_value(self):
+        html = '<ol start="7"><li>Seven</li><li>Eight</li><li value="20">Twenty</li><li>Twenty-one</li></ol>'
+        self.assertEqual(self.converter.convert(html), '7. Seven\n8. Eight\n20. Twenty\n21. Twenty-one')
+        self.assertEqual(self.converter.convert('<ol start="x"><li>One</li></ol>'), '1. One')
+
+    def test_wide_ordered_markers_keep_their_body(self):
+        # From "100. " on the marker is wider than the indent; the body must line up past it
+        html = '<ol start="98"><li>a<p>p1</p></li><li>b</li><li>c<p>p2</p><ul><li>sub</li></ul></li></ol>'
+        self.assertEqual(self.converter.convert(html),
+                         '98. a\n\n    p1\n99. b\n100. c\n\n     p2\n\n     * sub')
+
+    def test_task_list_items(self):
+        html = ('<ul><li><input type="checkbox" checked disabled> Done</li>'
+                '<li class="task-list-item"><p><input type="checkbox"> Pending</p></li>'
+                '<li>Plain <input type="checkbox"></li></ul>')
+        self.assertEqual(self.converter.convert(html), '* [x] Done\n* [ ] Pending\n* Plain')
+
+    def test_table_colspan_alignment_and_ragged_rows(self):
+        html = ('<table><thead><tr><th align="right">A</th><th style="text-align: center">B</th><th>C</th></tr></thead>'
+                '<tbody><tr><td colspan="2">Wide</td><td>x</td></tr><tr><td>Short</td></tr></tbody>'
+                '<tr><td>1</td><td>2</td><td>3</td><td>4</td></tr></table>')
+        expected_md = """
+| A | B | C |  |
+| ---: | :---: | --- | --- |
+| Wide |  | x |
+| Short |  |  |
+| 1 | 2 | 3 | 4 |
+        """.strip()
+        self.assertEqual(self.converter.convert(html), expected_md)
+
+    def test_nested_quotes_with_lists(self):
+        html = '<blockquote><p>Outer</p><blockquote><ul><li>x</li><li>y <code>z</code></li></ul></blockquote></blockquote>'
+        self.assertEqual(self.converter.convert(html), '> Outer\n>\n> > * x\n> > * y `z`')
+
+    def test_handlers_receive_ancestor_context(self):
+        seen = []
+        self.converter.register_handler('kbd', lambda element, content, context: seen.append(context) or content)
+        self.converter.convert('<blockquote><ul><li><kbd>a</kbd></li></ul></blockquote>'
+                               '<table><tr><td><kbd>b</kbd></td></tr></table><pre><kbd>c</kbd></pre>')
+        self.assertEqual([(c.quote_depth, c.list_depth, c.in_cell) for c in seen], [(1, 1, False), (0, 0, True)])
+        # A <pre> handler that converts its children sees them as preformatted
+        self.converter.register_handler('pre', lambda element, content, context: content)
+        self.assertEqual(self.converter.convert('<pre>  a\n  <code>b  c</code></pre>'), 'a\n  b  c')
+
+    def test_table_rows_without_table_wrapper(self):
+        html = '<tbody><tr><td>Only</td><td>a|b</td></tr></tbody>'
+        self.assertEqual(self.converter.convert(html), '| Only | a\\|b |\n| --- | --- |')
+        self.assertEqual(self.converter.convert('<table></table>'), '')
+
 if __name__ == '__main__':
     unittest.main()
 
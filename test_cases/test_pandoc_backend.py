@@ -0,0 +1,56 @@
+import unittest
+import sys
+import os
+import tempfile
+import subprocess
+from unittest import mock
+
+# Add parent directory to sys.path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandoc_backend
+from pandoc_backend import PandocError, PandocPool, pandoc_available, pandoc_to_markdown
+
+class TestPandocAvailability(unittest.TestCase):
+    def setUp(self):
+        pandoc_backend.pandoc_version.cache_clear()
+
+    def tearDown(self):
+        pandoc_backend.pandoc_version.cache_clear()
+
+    def test_checked_once_per_process(self):
+        completed = subprocess.CompletedProcess([], 0, stdout=b'pandoc 3.1.3\nFeatures: +server\n', stderr=b'')
+        with mock.patch.object(pandoc_backend.shutil, 'which', return_value='/usr/bin/pandoc'), \
+             mock.patch.object(pandoc_backend.subprocess, 'run', return_value=completed) as run:
+            for _ in range(3):
+                self.assertTrue(pandoc_available())
+        self.assertEqual(run.call_count, 1)
+        self.assertEqual(pandoc_backend.pandoc_version(), 'pandoc 3.1.3')
+
+    def test_missing_pandoc_raises(self):
+        with mock.patch.object(pandoc_backend.shutil, 'which', return_value=None):
+            self.assertFalse(pandoc_available())
+            with self.assertRaises(PandocError):
+                pandoc_to_markdown('<p>x</p>')
+
+@unittest.skipUnless(pandoc_available(), 'pandoc is not installed')
+class TestPandocConversion(unittest.TestCase):
+    def test_converts_through_pipes_without_files(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cwd = os.getcwd()
+            os.chdir(tmpdir)
+            try:
+                markdown = pandoc_to_markdown('<p><strong>Tú:</strong> Hola</p>')
+            finally:
+                os.chdir(cwd)
+            self.assertEqual(os.listdir(tmpdir), [])
+        self.assertEqual(markdown.strip(), '**Tú:** Hola')
+
+    def test_pool_keeps_input_order(self):
+        htmls = [f'<p>mensaje {n}</p>' for n in range(10)]
+        with PandocPool(max_workers=3) as pool:
+            results = list(pool.map(iter(htmls)))
+        self.assertEqual([r.strip() for r in results], [f'mensaje {n}' for n in range(10)])
+
+if __name__ == '__main__':
+    unittest.main()
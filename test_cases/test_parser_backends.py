@@ -0,0 +1,81 @@
+import unittest
+import sys
+import os
+import io
+import tempfile
+import contextlib
+
+# Add parent directory to sys.path to allow imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+from markdown_enhancer import EnhancedMarkdownConverter
+from parser_backends import AVAILABLE_BACKENDS, KNOWN_BACKENDS, DEFAULT_BACKEND, resolve_backend
+
+# Well-formed inputs only: HTML5 parsers (lxml, html5lib, selectolax) legitimately
+# restructure invalid nesting such as <div> inside <p>, so those are not compared.
+CONFORMANCE_CORPUS = [
+    '<p>Hello world</p>',
+    '<p>This is <strong>bold</strong> and <em>italic</em> text &amp; more.</p>',
+    '<p style="color: blue;" class="important">Content</p><a href="https://example.com" class="x">Link</a>',
+    "<p>Visible text</p><script>alert('invisible');</script><style>.hide {display:none;}</style>",
+    '<p>Text <span>inside span</span> and <span><span>nested</span></span></p>',
+    '<h1>Title 1</h1><h2>Title 2</h2><h6>Small</h6>',
+    '<ul><li>Item 1</li><li>Item 2<ul><li>Item 2.1</li></ul></li></ul>',
+    '<ol><li>First</li><li>Second<ol><li>Sub</li></ol></li></ol>',
+    '<img src="image.jpg" alt="Sample Image">',
+    '<p>Line one<br>Line two</p>',
+    '<blockquote><p>Quote para 1.</p><p>Quote para 2.</p></blockquote>',
+    '<p>Use <code>myVar</code> and <code>`tick`</code>.</p>',
+    '<pre><code class="language-python">def hello():\n  print("world")</code></pre>',
+    '<table><thead><tr><th>A</th><th>B</th></tr></thead><tbody><tr><td>1|2</td><td><code>x</code></td></tr></tbody></table>',
+    '<div><p>Para<!-- comment --> after comment</p></div>',
+]
+
+GEMINI_DOCUMENT = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Backends</title><style>.a{background:url(data:image/png;base64,AAAA)}</style></head>
+<body><div class="chat-history">
+<user-query><div class="query-content"><p class="query-text-line"> ¿Cómo ordeno   una <b>lista</b>? </p></div></user-query>
+<model-response><div id="model-response-message-contentr_1" class="markdown"><p>Usa <code>sorted()</code>:</p>
+<div class="code-block"><pre><code class="language-python">nums = [3, 1, 2]
+print(sorted(nums))</code></pre></div>
+<ul><li>Devuelve una lista nueva</li><li>Acepta <em>key</em><ul><li>y <strong>reverse</strong></li></ul></li></ul>
+<table><thead><tr><th>Función</th><th>Resultado</th></tr></thead><tbody><tr><td>sorted</td><td>nueva</td></tr></tbody></table>
+<blockquote><p>Nota</p></blockquote><!----></div></model-response>
+</div></body></html>
+"""
+
+class TestParserBackendConformance(unittest.TestCase):
+    def _backends(self):
+        for backend in KNOWN_BACKENDS:
+            with self.subTest(backend=backend):
+                if backend not in AVAILABLE_BACKENDS:
+                    self.skipTest(f'{backend} is not installed')
+                yield backend
+
+    def test_converter_output_is_identical(self):
+        reference = EnhancedMarkdownConverter(parser_backend=DEFAULT_BACKEND)
+        for backend in self._backends():
+            converter = EnhancedMarkdownConverter(parser_backend=backend)
+            for html in CONFORMANCE_CORPUS:
+                self.assertEqual(converter.convert(html), reference.convert(html), html)
+
+    def test_extracted_conversation_is_identical(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            html_file = os.path.join(tmpdir, 'chat.html')
+            with open(html_file, 'w', encoding='utf-8') as f:
+                f.write(GEMINI_DOCUMENT)
+            with contextlib.redirect_stdout(io.StringIO()):
+                expected = main.extract_gemini_conversation_singlepage(html_file, backend=DEFAULT_BACKEND)
+                self.assertEqual(len(expected), 2)
+                for backend in self._backends():
+                    self.assertEqual(main.extract_gemini_conversation_singlepage(html_file, backend=backend), expected)
+
+    def test_resolve_backend(self):
+        self.assertIn(resolve_backend('auto'), AVAILABLE_BACKENDS)
+        self.assertEqual(resolve_backend(None), DEFAULT_BACKEND)
+        with self.assertRaises(ValueError):
+            resolve_backend('no-such-parser')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,222 @@
+import unittest
+import sys
+import os
+import io
+import tempfile
+import contextlib
+from unittest import mock
+
+# Add parent directory to sys.path to allow imports from main
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import main
+import gemini_stream
+from conversation_model import Conversation, Message, Speaker
+
+SAMPLE_HTML = """<!DOCTYPE html>
+<html><head><title>Chat de prueba</title><style>.x{color:red}</style></head>
+<body>
+<user-query><p class="query-text-line">Hola Gemini</p></user-query>
+<model-response><div id="model-response-message-contentr_a1"><p>Hola, <b>¿qué tal?</b></p></div></model-response>
+<user-query><p class="query-text-line">Dame una lista</p></user-query>
+<model-response><div id="model-response-message-contentr_b2"><ul><li>Uno</li><li>Dos</li></ul></div></model-response>
+</body></html>
+"""
+
+class TestSingleParsePipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.html_file = os.path.join(self.tmpdir.name, 'chat (18_6_2025).html')
+        with open(self.html_file, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_HTML)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _convert_counting_parses(self):
+        with mock.patch.object(main, 'make_soup', wraps=main.make_soup) as parser:
+            with contextlib.redirect_stdout(io.StringIO()):
+                markdown = main.convert_to_gemini_markdown(self.html_file)
+        return markdown, parser.call_count
+
+    def test_document_is_parsed_once(self):
+        markdown, parse_count = self._convert_counting_parses()
+        self.assertIsNotNone(markdown)
+        self.assertEqual(parse_count, 1)
+
+    def test_pipeline_output(self):
+        markdown, _ = self._convert_counting_parses()
+        self.assertTrue(markdown.startswith('# 💬 Chat de prueba\n**📅 Fecha de conversación:** 18/6/2025'))
+        self.assertIn('<strong>Tú:</strong><br>\nHola Gemini', markdown)
+        self.assertIn('<strong>Gemini:</strong><br>\nHola, **¿qué tal?**', markdown)
+        self.assertIn('* Uno\n* Dos', markdown)
+        self.assertLess(markdown.index('Hola Gemini'), markdown.index('Dame una lista'))
+
+    def test_extractor_reuses_given_document(self):
+        soup = main.load_gemini_document(self.html_file)
+        with mock.patch.object(main, 'make_soup', wraps=main.make_soup) as parser:
+            with contextlib.redirect_stdout(io.StringIO()):
+                conversation = main.extract_gemini_conversation_singlepage(self.html_file, soup=soup)
+        self.assertEqual(parser.call_count, 0)
+        self.assertEqual([m.speaker for m in conversation], ['Tú', 'Gemini', 'Tú', 'Gemini'])
+
+    def test_messages_stream_in_document_order_with_positions(self):
+        soup = main.load_gemini_document(self.html_file)
+        messages = main.iter_gemini_messages(soup)
+        first = next(messages)
+        self.assertEqual((first.position, first.speaker, first.content), (0, 'Tú', 'Hola Gemini'))
+        rest = list(messages)
+        self.assertEqual([m.position for m in rest], [1, 2, 3])
+        self.assertEqual([m.speaker for m in rest], ['Gemini', 'Tú', 'Gemini'])
+
+    def test_streaming_extraction_matches_full_parse(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            expected = main.extract_gemini_conversation_singlepage(self.html_file)
+        for chunk_size in (5, 64, gemini_stream.DEFAULT_CHUNK_SIZE):
+            messages = gemini_stream.iter_gemini_messages_streaming(self.html_file, chunk_size=chunk_size)
+            self.assertEqual(list(main.unique_messages(messages)), expected)
+
+    def test_dedup_scopes(self):
+        contents = ['a', 'a', 'b', 'c', 'a', 'c', 'b']
+        messages = [Message('Gemini', c, n) for n, c in enumerate(contents)]
+        def kept(**options):
+            return [m.position for m in main.unique_messages(iter(messages), **options)]
+        self.assertEqual(kept(), [0, 2, 3])
+        self.assertEqual(kept(scope='adjacent'), [0, 2, 3, 4, 5, 6])
+        self.assertEqual(kept(scope='window', window=2), [0, 2, 3, 4, 6])
+        with self.assertRaises(ValueError):
+            kept(scope='todo')
+
+    def test_messages_carry_source_positions_not_tags(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            tree = main.extract_gemini_conversation_singlepage(self.html_file)
+            located = main.extract_gemini_conversation_located(self.html_file)
+        streamed = main.extract_gemini_conversation_streaming(self.html_file)
+        # (line, column) of each container's start tag in the file
+        self.assertEqual([m.source for m in tree], [(4, 12), (5, 16), (6, 12), (7, 16)])
+        self.assertEqual([m.source for m in located], [m.source for m in tree])
+        self.assertEqual([m.source for m in streamed], [m.source for m in tree])
+        self.assertIs(tree[0].speaker, Speaker.USER)
+        self.assertFalse(hasattr(tree[0], '__dict__'))
+
+    def test_streaming_conversion_builds_no_document_tree(self):
+        with mock.patch.object(main, 'make_soup', wraps=main.make_soup) as parser:
+            with contextlib.redirect_stdout(io.StringIO()):
+                streamed = main.convert_to_gemini_markdown(self.html_file, reader='stream')
+        self.assertEqual(parser.call_count, 0)
+        full, _ = self._convert_counting_parses()
+        self.assertEqual(streamed.split('\n', 3)[3], full.split('\n', 3)[3])
+        self.assertTrue(streamed.startswith('# 💬 Chat de prueba\n'))
+
+    def test_writer_emits_each_message_as_it_is_produced(self):
+        produced = []
+        writes = []
+
+        class Sink:
+            def write(self, text):
+                writes.append((text, len(produced)))
+
+        def messages():
+            for n in range(3):
+                produced.append(n)
+                yield Message('Tú' if n % 2 == 0 else 'Gemini', f'mensaje {n}')
+
+        metadata = {'title': 'T', 'date': 'hoy'}
+        self.assertEqual(main.write_gemini_markdown(messages(), metadata, Sink()), 3)
+        # Header, one write per bubble while only that message exists, then the footer
+        self.assertEqual([produced_so_far for _, produced_so_far in writes], [0, 1, 2, 3, 3])
+        self.assertEqual(''.join(text for text, _ in writes),
+                         main.render_gemini_markdown([Message('Tú', 'mensaje 0'), Message('Gemini', 'mensaje 1'),
+                                                      Message('Tú', 'mensaje 2')], metadata))
+
+    def test_convert_file_streams_to_disk(self):
+        output_path = os.path.join(self.tmpdir.name, 'out', 'chat.md')
+        for reader in main.READERS:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = main.convert_file(self.html_file, output_path, reader=reader)
+                expected = main.convert_to_gemini_markdown(self.html_file, reader=reader)
+            self.assertIsNone(result['error'])
+            with open(output_path, encoding='utf-8') as f:
+                self.assertEqual(f.read().split('\n', 3)[3], expected.split('\n', 3)[3])
+            self.assertFalse(os.path.exists(output_path + '.tmp'))
+
+PLAIN_HTML = """<html><head><title>Otro chat</title></head><body><div class="chat-history">
+<div class="user">Tú: ¿Cómo se ordena una lista en Python?</div>
+<div class="bot">Gemini: Con la función sorted() o con el método sort().</div>
+</div></body></html>
+"""
+
+BLOG_HTML = """<html><head><title>Recetas</title></head><body><article>
+<p>El pan de masa madre necesita una fermentación larga y paciente.</p>
+<p>Hornea a doscientos cincuenta grados durante cuarenta minutos.</p>
+</article></body></html>
+"""
+
+class TestExtractionStrategies(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _write(self, name, html):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        return path
+
+    def _auto(self, html_file, strategies=None):
+        with mock.patch.object(main, 'make_soup', wraps=main.make_soup) as parser:
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = main.extract_conversation_auto(html_file, strategies=strategies)
+        return result, parser.call_count
+
+    def test_gemini_export_uses_byte_scan(self):
+        html_file = self._write('chat.html', SAMPLE_HTML)
+        result, _ = self._auto(html_file)
+        self.assertEqual(result['strategy'], 'scan')
+        self.assertTrue(result['confident'])
+        self.assertEqual([name for name, _, _ in result['attempts']], ['scan'])
+        self.assertEqual(result['title'], 'Chat de prueba')
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertEqual(list(result['conversation']), list(main.extract_gemini_conversation_singlepage(html_file)))
+
+    def test_falls_back_in_cost_order_sharing_one_parse(self):
+        result, parse_count = self._auto(self._write('otro.html', PLAIN_HTML))
+        self.assertEqual(result['strategy'], 'targeted')
+        # The probe skips the scan; both tree heuristics and the title share a single parse
+        self.assertEqual([name for name, _, _ in result['attempts']], ['combined', 'targeted'])
+        self.assertEqual(parse_count, 1)
+        self.assertEqual(result['title'], 'Otro chat')
+        self.assertEqual([m.speaker for m in result['conversation']], ['Tú', 'Gemini'])
+
+    def test_inferred_turns_are_not_confident(self):
+        # Alternating turns gives any two paragraphs both speakers; without an
+        # explicit speaker the heuristics must not stop the fallback chain
+        result, _ = self._auto(self._write('blog.html', BLOG_HTML))
+        names = [name for name, _, _ in result['attempts']]
+        self.assertIn('targeted', names)
+        self.assertIn('text', names)
+        self.assertFalse(result['confident'])
+
+    def test_text_fallback_prints_one_summary_line(self):
+        html_file = self._write('texto.html', '<p>Un párrafo largo con bastante texto dentro</p>'
+                                + '<p>corto</p>' * 50
+                                + '<p>Pregunta: otro bloque de texto suficientemente largo</p>')
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            conversation = main.extract_conversation_from_text(html_file)
+        self.assertEqual(len(output.getvalue().splitlines()), 1)
+        self.assertIn(f'{len(conversation)} mensajes válidos', output.getvalue())
+
+    def test_unconfident_results_are_flagged(self):
+        strategies = [main.ExtractionStrategy('one-sided', lambda ctx: True,
+                                              lambda ctx: Conversation([Message('Tú', 'hola')]),
+                                              main._has_both_speakers),
+                      main.ExtractionStrategy('empty', lambda ctx: True, lambda ctx: Conversation(), main._has_messages)]
+        result, _ = self._auto(self._write('x.html', PLAIN_HTML), strategies)
+        self.assertEqual((result['strategy'], result['confident']), ('one-sided', False))
+        self.assertEqual(len(result['attempts']), 2)
+
+if __name__ == '__main__':
+    unittest.main()